@@ -9,12 +9,20 @@ GET  /review/stats         → Estatísticas da fila de revisão
 
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
-
-from app.database import get_db
-from app.domain.models import Card, ExtractedItem, SRSState
+from sqlalchemy import func, select
+
+from app.database import DbSession
+from app.domain.models import (
+    CURRENT_USER_ID,
+    Card,
+    ExtractedItem,
+    SRSCardState,
+    SRSState,
+    utc_now,
+)
+from app.services import worker
 from app.services.review import get_due_cards, submit_review
 
 router = APIRouter(prefix="/review", tags=["review"])
@@ -32,19 +40,22 @@ class ReviewSubmit(BaseModel):
 
 @router.get("/due")
 def get_cards_due(
+    db: DbSession,
     limit: int = 20,
     include_new: bool = True,
-    db: Session = Depends(get_db),
+    include_lesson_title: bool = False,
 ):
     """
     Retorna cards devidos para revisão agora.
     Ordenados por urgência (relearning > learning > review > new).
+    O título da aula de cada card só vem com include_lesson_title=true.
     """
     cards = get_due_cards(
-        user_id=1,
+        user_id=CURRENT_USER_ID,
         db=db,
         limit=limit,
         include_new=include_new,
+        include_lesson_title=include_lesson_title,
     )
     return {
         "cards": cards,
@@ -55,7 +66,7 @@ def get_cards_due(
 @router.post("/submit")
 def submit_card_review(
     payload: ReviewSubmit,
-    db: Session = Depends(get_db),
+    db: DbSession,
 ):
     """
     Submete o resultado de uma revisão de card.
@@ -70,48 +81,42 @@ def submit_card_review(
     """
     try:
         result = submit_review(
-            user_id=1,
+            user_id=CURRENT_USER_ID,
             card_id=payload.card_id,
             quality=payload.quality,
             response_time_ms=payload.response_time_ms,
             db=db,
         )
-        return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+    # Atualiza padrões de erro fora do caminho da resposta, coalescendo
+    # revisões em sequência numa única análise (sessão própria no worker)
+    worker.schedule_pattern_analysis(user_id=CURRENT_USER_ID)
+
+    return result
+
 
 @router.get("/stats")
-def get_review_queue_stats(db: Session = Depends(get_db)):
+def get_review_queue_stats(db: DbSession):
     """
     Retorna estatísticas rápidas da fila de revisão.
     Útil para o header da UI mostrar quantos cards estão pendentes.
     """
-    from datetime import datetime
-    from sqlalchemy import func
-    from app.domain.models import SRSCardState
-
-    now = datetime.utcnow()
-
-    due_count = (
-        db.query(SRSState)
-        .filter(SRSState.user_id == 1)
-        .filter(SRSState.due_date <= now)
-        .count()
-    )
-
-    new_count = (
-        db.query(SRSState)
-        .filter(SRSState.user_id == 1)
-        .filter(SRSState.state == SRSCardState.NEW)
-        .count()
-    )
-
-    relearning_count = (
-        db.query(SRSState)
-        .filter(SRSState.user_id == 1)
-        .filter(SRSState.state == SRSCardState.RELEARNING)
-        .count()
+    # Uma única varredura em srs_states com contagens condicionais. O "agora"
+    # vem do Python, como em /review/due e /progress: due_date é gravado com
+    # microssegundos e o CURRENT_TIMESTAMP do SQLite tem precisão de segundos
+    now = utc_now()
+    due_count, new_count, relearning_count = (
+        db.execute(
+            select(
+                func.count().filter(SRSState.due_date <= now),
+                func.count().filter(SRSState.state == SRSCardState.NEW),
+                func.count().filter(SRSState.state == SRSCardState.RELEARNING),
+            )
+            .select_from(SRSState)
+            .where(SRSState.user_id == CURRENT_USER_ID)
+        ).one()
     )
 
     return {
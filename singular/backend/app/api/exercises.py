@@ -7,15 +7,24 @@ POST /exercises/submit    → Submete resposta + avalia + registra
 GET  /exercises/by-lesson/{id} → Exercícios de uma aula específica
 """
 
-from typing import Optional
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import AliasPath, BaseModel, ConfigDict, Field
+from sqlalchemy import insert, select
+from sqlalchemy.orm import contains_eager, joinedload
 
-from app.database import get_db
+from app.database import DbSession
 from app.domain.adaptation import get_recommended_exercise_type
-from app.domain.models import Card, Exercise, ExerciseSubmission, ExerciseType
+from app.domain.models import (
+    CURRENT_USER_ID,
+    Card,
+    CardType,
+    Exercise,
+    ExerciseSubmission,
+    ExerciseType,
+)
+from app.services import worker
 from app.services.exercise import evaluate_answer
 
 router = APIRouter(prefix="/exercises", tags=["exercises"])
@@ -29,30 +38,59 @@ class ExerciseSubmit(BaseModel):
     response_time_ms: Optional[int] = None
 
 
+class ExerciseOut(BaseModel):
+    """Exercício para praticar. NÃO expõe expected_answer (enviado só na avaliação)."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    card_id: int
+    type: ExerciseType = Field(validation_alias="exercise_type")
+    prompt: str
+    context: Optional[str]
+    options: Optional[Any]
+    card_type: Optional[CardType] = Field(validation_alias=AliasPath("card", "card_type"))
+
+
+class ExerciseListOut(BaseModel):
+    exercises: List[ExerciseOut]
+    total: int
+
+
+class LessonExercisesOut(BaseModel):
+    lesson_id: int
+    exercises: List[ExerciseOut]
+    total: int
+
+
 # ─── Rotas ────────────────────────────────────────────────────────────────────
 
-@router.get("")
+@router.get("", response_model=ExerciseListOut)
 def get_exercises(
+    db: DbSession,
     limit: int = Query(10, ge=1, le=50),
     exercise_type: Optional[str] = Query(None),
     lesson_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db),
 ):
     """
     Retorna exercícios para praticar.
     Prioriza o tipo recomendado pelo motor de adaptação.
     """
-    # Consulta base
-    query = db.query(Exercise).join(Card, Exercise.card_id == Card.id)
+    # Consulta base — o card vem do próprio JOIN (sem query extra por exercício),
+    # só com a coluna que a resposta usa (card_type)
+    stmt = (
+        select(Exercise)
+        .join(Card, Exercise.card_id == Card.id)
+        .options(contains_eager(Exercise.card).load_only(Card.card_type))
+    )
 
     if lesson_id:
-        query = query.filter(Card.lesson_id == lesson_id)
+        stmt = stmt.where(Card.lesson_id == lesson_id)
 
     # Filtra por tipo se especificado
     if exercise_type:
         try:
             ex_type = ExerciseType(exercise_type)
-            query = query.filter(Exercise.exercise_type == ex_type)
+            stmt = stmt.where(Exercise.exercise_type == ex_type)
         except ValueError:
             raise HTTPException(
                 status_code=422,
@@ -60,28 +98,28 @@ def get_exercises(
             )
     else:
         # Sem tipo especificado → tenta usar o tipo recomendado pelo motor adaptativo
-        recommended = get_recommended_exercise_type(user_id=1, db=db)
+        recommended = get_recommended_exercise_type(user_id=CURRENT_USER_ID, db=db)
         if recommended:
-            query = query.filter(Exercise.exercise_type == recommended)
+            stmt = stmt.where(Exercise.exercise_type == recommended)
 
-    exercises = query.limit(limit).all()
+    exercises = db.scalars(stmt.limit(limit)).all()
 
-    return {
-        "exercises": [_exercise_to_dict(ex, db) for ex in exercises],
-        "total": len(exercises),
-    }
+    return ExerciseListOut(
+        exercises=[ExerciseOut.model_validate(ex) for ex in exercises],
+        total=len(exercises),
+    )
 
 
 @router.post("/submit")
 def submit_exercise(
     payload: ExerciseSubmit,
-    db: Session = Depends(get_db),
+    db: DbSession,
 ):
     """
     Submete uma resposta para um exercício.
     Avalia automaticamente e registra para o motor adaptativo.
     """
-    exercise = db.query(Exercise).filter(Exercise.id == payload.exercise_id).first()
+    exercise = db.get(Exercise, payload.exercise_id)
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercício não encontrado.")
 
@@ -92,26 +130,27 @@ def submit_exercise(
         exercise_type=exercise.exercise_type,
     )
 
-    # Registra a submissão
-    submission = ExerciseSubmission(
-        exercise_id=exercise.id,
-        user_id=1,
-        user_answer=payload.user_answer,
-        is_correct=evaluation.is_correct,
-        score=evaluation.score,
-        response_time_ms=payload.response_time_ms,
-        error_category=evaluation.error_category,
+    # Registra a submissão antes de responder: um INSERT Core, sem refresh do
+    # objeto. Com WAL + synchronous=NORMAL o commit não força fsync, e uma
+    # falha de escrita (ex.: banco travado pelo pipeline) aparece como erro
+    # em vez de perder a submissão que alimenta o motor adaptativo
+    db.execute(
+        insert(ExerciseSubmission).values(
+            exercise_id=exercise.id,
+            user_id=CURRENT_USER_ID,
+            user_answer=payload.user_answer,
+            is_correct=evaluation.is_correct,
+            score=evaluation.score,
+            response_time_ms=payload.response_time_ms,
+            error_category=evaluation.error_category,
+        )
     )
-    db.add(submission)
     db.commit()
 
-    # Atualiza padrões de erro se errou
+    # Atualiza padrões de erro se errou — fora do caminho da resposta,
+    # coalescendo rajadas de erros numa única análise
     if not evaluation.is_correct:
-        try:
-            from app.domain.adaptation import analyze_and_update_patterns
-            analyze_and_update_patterns(user_id=1, db=db)
-        except Exception:
-            pass
+        worker.schedule_pattern_analysis(user_id=CURRENT_USER_ID)
 
     return {
         "exercise_id": exercise.id,
@@ -124,46 +163,35 @@ def submit_exercise(
     }
 
 
-@router.get("/by-lesson/{lesson_id}")
+@router.get("/by-lesson/{lesson_id}", response_model=LessonExercisesOut)
 def get_exercises_by_lesson(
     lesson_id: int,
-    db: Session = Depends(get_db),
+    db: DbSession,
 ):
     """Retorna todos os exercícios de uma aula específica."""
-    exercises = (
-        db.query(Exercise)
+    exercises = db.scalars(
+        select(Exercise)
         .join(Card, Exercise.card_id == Card.id)
-        .filter(Card.lesson_id == lesson_id)
-        .all()
+        .options(contains_eager(Exercise.card).load_only(Card.card_type))
+        .where(Card.lesson_id == lesson_id)
+    ).all()
+
+    return LessonExercisesOut(
+        lesson_id=lesson_id,
+        exercises=[ExerciseOut.model_validate(ex) for ex in exercises],
+        total=len(exercises),
     )
 
-    return {
-        "lesson_id": lesson_id,
-        "exercises": [_exercise_to_dict(ex, db) for ex in exercises],
-        "total": len(exercises),
-    }
-
 
-@router.get("/{exercise_id}")
-def get_exercise(exercise_id: int, db: Session = Depends(get_db)):
+@router.get("/{exercise_id}", response_model=ExerciseOut)
+def get_exercise(exercise_id: int, db: DbSession):
     """Retorna um exercício específico."""
-    exercise = db.query(Exercise).filter(Exercise.id == exercise_id).first()
+    exercise = db.get(
+        Exercise,
+        exercise_id,
+        options=[joinedload(Exercise.card).load_only(Card.card_type)],
+    )
     if not exercise:
         raise HTTPException(status_code=404, detail="Exercício não encontrado.")
-    return _exercise_to_dict(exercise, db)
-
-
-# ─── Helpers ──────────────────────────────────────────────────────────────────
+    return ExerciseOut.model_validate(exercise)
 
-def _exercise_to_dict(exercise: Exercise, db: Session) -> dict:
-    card = db.query(Card).filter(Card.id == exercise.card_id).first()
-    return {
-        "id": exercise.id,
-        "card_id": exercise.card_id,
-        "type": exercise.exercise_type.value,
-        "prompt": exercise.prompt,
-        "context": exercise.context,
-        "options": exercise.options,
-        # NÃO expõe expected_answer aqui (enviado só na avaliação)
-        "card_type": card.card_type.value if card else None,
-    }
@@ -9,25 +9,31 @@ GET  /lessons/{id}/status → Status do pipeline
 DELETE /lessons/{id}   → Remove aula e todos os dados associados
 """
 
-import threading
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import Select, delete, distinct, func, select
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import DbSession
 from app.domain.models import (
+    CURRENT_USER_ID,
     Card,
+    ErrorPatternCard,
     ExtractedItem,
     Exercise,
+    ExerciseSubmission,
+    ItemType,
     Lesson,
     LessonStatus,
+    ReviewLog,
     SRSState,
     Transcript,
 )
-from app.services.pipeline import run_import_pipeline
+from app.services import worker
+from app.services.review import invalidate_due_cards
 
 router = APIRouter(prefix="/lessons", tags=["lessons"])
 
@@ -41,20 +47,33 @@ class LessonCreate(BaseModel):
 
 
 class LessonResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     url: Optional[str]
     title: Optional[str]
     language: Optional[str]
     level: Optional[str]
-    status: str
+    status: LessonStatus
     error_message: Optional[str]
-    created_at: str
-    processed_at: Optional[str]
+    created_at: Optional[datetime]
+    processed_at: Optional[datetime]
     cards_count: int = 0
     exercises_count: int = 0
 
-    class Config:
-        from_attributes = True
+
+class LessonItemOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: ItemType = Field(validation_alias="item_type")
+    content: str
+    reading: Optional[str]
+    translation: Optional[str]
+    context_sentence: Optional[str]
+    explanation: Optional[str]
+    complexity: Optional[float]
+    usefulness: Optional[float]
 
 
 # ─── Rotas ────────────────────────────────────────────────────────────────────
@@ -62,12 +81,11 @@ class LessonResponse(BaseModel):
 @router.post("", response_model=LessonResponse, status_code=201)
 def create_lesson(
     payload: LessonCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: DbSession,
 ):
     """
     Importa uma nova aula.
-    O pipeline de processamento roda em background.
+    O pipeline de processamento roda no worker de background.
     Retorna imediatamente com status=pending.
     """
     # Validação básica
@@ -79,7 +97,7 @@ def create_lesson(
 
     # Cria a aula no banco (status=pending)
     lesson = Lesson(
-        user_id=1,  # single-user MVP
+        user_id=CURRENT_USER_ID,
         url=payload.url,
         title=payload.title or _extract_title_from_url(payload.url),
         language=payload.language,
@@ -89,141 +107,161 @@ def create_lesson(
     db.commit()
     db.refresh(lesson)
 
-    # Dispara pipeline em background
-    background_tasks.add_task(
-        _run_pipeline_background,
+    # Enfileira o pipeline no worker dedicado (fora do threadpool da API)
+    worker.submit_pipeline(
         lesson_id=lesson.id,
-        user_id=1,
+        user_id=CURRENT_USER_ID,
         use_mock=payload.use_mock,
     )
 
-    return _lesson_to_response(lesson, db)
+    # Aula recém-criada ainda não tem cards nem exercícios
+    return _lesson_to_response(lesson, cards_count=0, exercises_count=0)
 
 
-@router.get("", response_model=list)
+@router.get("", response_model=List[LessonResponse])
 def list_lessons(
-    db: Session = Depends(get_db),
+    db: DbSession,
     limit: int = Query(20, ge=1, le=100),
 ):
     """Lista todas as aulas do usuário, ordenadas por data de criação (mais recente primeiro)."""
-    lessons = (
-        db.query(Lesson)
-        .filter(Lesson.user_id == 1)
+    rows = db.execute(
+        _select_lessons_with_counts()
+        .where(Lesson.user_id == CURRENT_USER_ID)
         .order_by(Lesson.created_at.desc())
         .limit(limit)
-        .all()
-    )
-    return [_lesson_to_response(l, db) for l in lessons]
+    ).all()
+    return [_lesson_to_response(l, cards, exercises) for l, cards, exercises in rows]
 
 
 @router.get("/{lesson_id}", response_model=LessonResponse)
-def get_lesson(lesson_id: int, db: Session = Depends(get_db)):
+def get_lesson(lesson_id: int, db: DbSession):
     """Retorna detalhes de uma aula específica."""
-    lesson = _get_or_404(lesson_id, db)
-    return _lesson_to_response(lesson, db)
+    row = db.execute(_select_lessons_with_counts().where(Lesson.id == lesson_id)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Aula não encontrada.")
+    return _lesson_to_response(*row)
 
 
 @router.get("/{lesson_id}/status")
-def get_lesson_status(lesson_id: int, db: Session = Depends(get_db)):
+def get_lesson_status(lesson_id: int, db: DbSession):
     """Retorna status do pipeline para polling da UI."""
-    lesson = _get_or_404(lesson_id, db)
-
-    cards_count = db.query(Card).filter(Card.lesson_id == lesson_id).count()
+    # Status + as três contagens num único round-trip (subqueries escalares)
+    cards_count = (
+        select(func.count())
+        .select_from(Card)
+        .where(Card.lesson_id == Lesson.id)
+        .scalar_subquery()
+    )
     exercises_count = (
-        db.query(Exercise)
+        select(func.count())
+        .select_from(Exercise)
         .join(Card, Exercise.card_id == Card.id)
-        .filter(Card.lesson_id == lesson_id)
-        .count()
+        .where(Card.lesson_id == Lesson.id)
+        .scalar_subquery()
     )
     items_count = (
-        db.query(ExtractedItem).filter(ExtractedItem.lesson_id == lesson_id).count()
+        select(func.count())
+        .select_from(ExtractedItem)
+        .where(ExtractedItem.lesson_id == Lesson.id)
+        .scalar_subquery()
     )
+    row = db.execute(
+        select(
+            Lesson.status,
+            Lesson.error_message,
+            Lesson.processed_at,
+            cards_count,
+            exercises_count,
+            items_count,
+        ).where(Lesson.id == lesson_id)
+    ).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Aula não encontrada.")
 
+    status, error_message, processed_at, cards, exercises, items = row
     return {
         "lesson_id": lesson_id,
-        "status": lesson.status.value,
-        "error_message": lesson.error_message,
-        "cards_count": cards_count,
-        "exercises_count": exercises_count,
-        "items_count": items_count,
-        "processed_at": lesson.processed_at.isoformat() if lesson.processed_at else None,
+        "status": status.value,
+        "error_message": error_message,
+        "cards_count": cards,
+        "exercises_count": exercises,
+        "items_count": items,
+        "processed_at": processed_at,
     }
 
 
-@router.get("/{lesson_id}/items")
-def get_lesson_items(lesson_id: int, db: Session = Depends(get_db)):
+@router.get("/{lesson_id}/items", response_model=List[LessonItemOut])
+def get_lesson_items(lesson_id: int, db: DbSession):
     """Retorna os itens extraídos de uma aula."""
     _get_or_404(lesson_id, db)
 
-    items = (
-        db.query(ExtractedItem)
-        .filter(ExtractedItem.lesson_id == lesson_id)
-        .all()
-    )
+    items = db.scalars(
+        select(ExtractedItem).where(ExtractedItem.lesson_id == lesson_id)
+    ).all()
 
-    return [
-        {
-            "id": item.id,
-            "type": item.item_type.value,
-            "content": item.content,
-            "reading": item.reading,
-            "translation": item.translation,
-            "context_sentence": item.context_sentence,
-            "explanation": item.explanation,
-            "complexity": item.complexity,
-            "usefulness": item.usefulness,
-        }
-        for item in items
-    ]
+    return [LessonItemOut.model_validate(item) for item in items]
 
 
 @router.delete("/{lesson_id}", status_code=204)
-def delete_lesson(lesson_id: int, db: Session = Depends(get_db)):
+def delete_lesson(lesson_id: int, db: DbSession):
     """Remove aula e todos os dados associados (cascade)."""
     lesson = _get_or_404(lesson_id, db)
-
-    # Remove em cascata manualmente (SQLite não tem CASCADE fácil)
-    cards = db.query(Card).filter(Card.lesson_id == lesson_id).all()
-    for card in cards:
-        db.query(Exercise).filter(Exercise.card_id == card.id).delete()
-        db.query(SRSState).filter(SRSState.card_id == card.id).delete()
-    db.query(Card).filter(Card.lesson_id == lesson_id).delete()
-    db.query(ExtractedItem).filter(ExtractedItem.lesson_id == lesson_id).delete()
-    db.query(Transcript).filter(Transcript.lesson_id == lesson_id).delete()
-    db.delete(lesson)
+    user_id = lesson.user_id
+
+    # Remove em cascata manualmente: um DELETE por tabela, com os cards (e
+    # exercícios) da aula resolvidos por subquery (número de statements
+    # constante). O histórico de revisões e submissões sai junto: senão
+    # continuaria alimentando o motor adaptativo e o progresso
+    card_ids = select(Card.id).where(Card.lesson_id == lesson_id)
+    exercise_ids = select(Exercise.id).where(Exercise.card_id.in_(card_ids))
+    for stmt in (
+        delete(ErrorPatternCard).where(ErrorPatternCard.card_id.in_(card_ids)),
+        delete(ExerciseSubmission).where(ExerciseSubmission.exercise_id.in_(exercise_ids)),
+        delete(ReviewLog).where(ReviewLog.card_id.in_(card_ids)),
+        delete(Exercise).where(Exercise.card_id.in_(card_ids)),
+        delete(SRSState).where(SRSState.card_id.in_(card_ids)),
+        delete(Card).where(Card.lesson_id == lesson_id),
+        delete(ExtractedItem).where(ExtractedItem.lesson_id == lesson_id),
+        delete(Transcript).where(Transcript.lesson_id == lesson_id),
+        delete(Lesson).where(Lesson.id == lesson_id),
+    ):
+        db.execute(stmt, execution_options={"synchronize_session": False})
     db.commit()
+    invalidate_due_cards(user_id)
 
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 
 def _get_or_404(lesson_id: int, db: Session) -> Lesson:
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = db.get(Lesson, lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Aula não encontrada.")
     return lesson
 
 
-def _lesson_to_response(lesson: Lesson, db: Session) -> dict:
-    cards_count = db.query(Card).filter(Card.lesson_id == lesson.id).count()
-    exercises_count = (
-        db.query(Exercise)
-        .join(Card, Exercise.card_id == Card.id)
-        .filter(Card.lesson_id == lesson.id)
-        .count()
+def _select_lessons_with_counts() -> Select:
+    """
+    SELECT de (Lesson, cards_count, exercises_count) agregado por aula.
+    Um único GROUP BY em vez de duas contagens por aula listada.
+    """
+    return (
+        select(
+            Lesson,
+            func.count(distinct(Card.id)),
+            func.count(distinct(Exercise.id)),
+        )
+        .outerjoin(Card, Card.lesson_id == Lesson.id)
+        .outerjoin(Exercise, Exercise.card_id == Card.id)
+        .group_by(Lesson.id)
+    )
+
+
+def _lesson_to_response(
+    lesson: Lesson, cards_count: int, exercises_count: int
+) -> LessonResponse:
+    return LessonResponse.model_validate(lesson).model_copy(
+        update={"cards_count": cards_count, "exercises_count": exercises_count}
     )
-    return {
-        "id": lesson.id,
-        "url": lesson.url,
-        "title": lesson.title,
-        "language": lesson.language,
-        "level": lesson.level,
-        "status": lesson.status.value,
-        "error_message": lesson.error_message,
-        "created_at": lesson.created_at.isoformat() if lesson.created_at else None,
-        "processed_at": lesson.processed_at.isoformat() if lesson.processed_at else None,
-        "cards_count": cards_count,
-        "exercises_count": exercises_count,
-    }
 
 
 def _extract_title_from_url(url: Optional[str]) -> Optional[str]:
@@ -234,17 +272,3 @@ def _extract_title_from_url(url: Optional[str]) -> Optional[str]:
         return f"Aula do YouTube"
     return url[:50] if url else None
 
-
-def _run_pipeline_background(lesson_id: int, user_id: int, use_mock: bool):
-    """Executa o pipeline em background com nova sessão do banco."""
-    from app.database import SessionLocal
-    db = SessionLocal()
-    try:
-        run_import_pipeline(
-            lesson_id=lesson_id,
-            user_id=user_id,
-            db=db,
-            use_mock=use_mock,
-        )
-    finally:
-        db.close()
@@ -6,18 +6,22 @@ GET /progress         → Estatísticas gerais de progresso
 GET /progress/adaptation → Resumo das adaptações ativas
 """
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import logging
 
-from app.database import get_db
+from fastapi import APIRouter
+
+from app.database import DbSession
 from app.domain.adaptation import get_adaptation_summary, resolve_pattern_if_improved
+from app.domain.models import CURRENT_USER_ID
 from app.services.review import get_progress_stats
 
 router = APIRouter(prefix="/progress", tags=["progress"])
 
+logger = logging.getLogger(__name__)
+
 
 @router.get("")
-def get_progress(db: Session = Depends(get_db)):
+def get_progress(db: DbSession):
     """
     Retorna estatísticas completas de progresso do aluno.
 
@@ -28,11 +32,11 @@ def get_progress(db: Session = Depends(get_db)):
     - Retenção estimada
     - Histórico diário de revisões
     """
-    return get_progress_stats(user_id=1, db=db)
+    return get_progress_stats(user_id=CURRENT_USER_ID, db=db)
 
 
 @router.get("/adaptation")
-def get_adaptation(db: Session = Depends(get_db)):
+def get_adaptation(db: DbSession):
     """
     Retorna resumo das adaptações ativas do motor adaptativo.
 
@@ -43,8 +47,10 @@ def get_adaptation(db: Session = Depends(get_db)):
     """
     # Tenta resolver padrões melhorados antes de retornar
     try:
-        resolve_pattern_if_improved(user_id=1, db=db)
+        resolve_pattern_if_improved(user_id=CURRENT_USER_ID, db=db)
     except Exception:
-        pass
+        # Best-effort: o resumo sai mesmo se a resolução falhar
+        logger.exception("Falha ao resolver padrões de erro melhorados")
+        db.rollback()
 
-    return get_adaptation_summary(user_id=1, db=db)
+    return get_adaptation_summary(user_id=CURRENT_USER_ID, db=db)
@@ -0,0 +1,59 @@
+"""
+Cache em memória com TTL — Singular
+Memoização por processo usada pelo domínio e pelos serviços (respostas
+consultadas em polling pela UI, resultados de chamadas externas). Fica na
+raiz de `app`, como o `database`, para o domínio não depender de `services`.
+
+Thread-safe: as rotas síncronas rodam em paralelo no threadpool do FastAPI.
+O cache é por processo; cada worker do uvicorn mantém o seu.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Dicionário com expiração por entrada e tamanho máximo."""
+
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                self._evict()
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> None:
+        """Remove as entradas cuja chave satisfaz `predicate` (todas, se omitido)."""
+        with self._lock:
+            if predicate is None:
+                self._data.clear()
+                return
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def _evict(self) -> None:
+        """Descarta expirados; se ainda cheio, remove a entrada mais antiga."""
+        now = time.monotonic()
+        for key in [k for k, (exp, _) in self._data.items() if exp <= now]:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
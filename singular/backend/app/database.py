@@ -1,19 +1,65 @@
 """
 Configuração do banco de dados SQLite com SQLAlchemy.
 SQLite para MVP local — fácil trocar por PostgreSQL em produção.
+
+As rotas são `def` síncronas: o FastAPI as executa no threadpool, então
+as queries não bloqueiam o event loop. Todas recebem a sessão via `DbSession`.
 """
 
-from sqlalchemy import create_engine
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./singular.db"
 
+# Driver SQLite: usa o pysqlite3-binary (build recente do SQLite, com STAT4)
+# quando instalado; senão, o sqlite3 da stdlib. Opcional — não está no
+# requirements porque só há wheels para Linux.
+try:
+    import pysqlite3 as sqlite_dbapi
+except ImportError:
+    sqlite_dbapi = None
+
+# Pool de conexões quentes: abrir o arquivo e aplicar os PRAGMAs custa mais
+# que a própria query, então as conexões são reaproveitadas entre requests.
+# O tamanho acompanha o threadpool do FastAPI, onde as rotas síncronas rodam.
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},  # necessário para SQLite com FastAPI
+    module=sqlite_dbapi,  # None → driver padrão do dialeto (sqlite3)
+    poolclass=QueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_recycle=3600,
+)
+
+# PRAGMAs aplicados em cada nova conexão do pool:
+#   WAL          → leitores não bloqueiam o escritor (pipeline em background)
+#   NORMAL       → fsync só no checkpoint do WAL, seguro com WAL
+#   cache/mmap   → cache de páginas de 64 MB e leituras via mmap (256 MB)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -21,14 +67,29 @@ Base = declarative_base()
 
 def get_db():
     """Dependency para injeção do banco nas rotas FastAPI."""
-    db = SessionLocal()
-    try:
+    with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+# Dependency tipada usada por todas as rotas: `db: DbSession`
+DbSession = Annotated[Session, Depends(get_db)]
+
+
+def dialect_insert(db: Session, table):
+    """
+    INSERT do dialeto da sessão — SQLite ou PostgreSQL —, para os comandos
+    que usam `on_conflict_do_nothing()` (cláusula específica de cada dialeto).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
 
 
 def create_tables():
     """Cria todas as tabelas no banco. Chamado no startup da aplicação."""
     from app.domain import models  # noqa: F401 — importar para registrar os models
     Base.metadata.create_all(bind=engine)
+    # create_all não altera tabelas já existentes: garante os índices em bancos antigos
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -11,21 +11,29 @@ Lógica central (bigbang.md §6):
 O erro não é punição — é dado. (bigbang.md §5)
 """
 
+import statistics
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Collection, Dict, List, Optional, Tuple
 
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
+from app.cache import TTLCache
+from app.database import dialect_insert
 from app.domain.models import (
     Card,
     CardType,
     ErrorPattern,
+    ErrorPatternCard,
+    Exercise,
     ExerciseSubmission,
     ExerciseType,
     PatternType,
     ReviewLog,
     SRSState,
     User,
+    utc_now,
 )
 
 
@@ -52,6 +60,19 @@ MAX_SEVERITY = 1.0
 # Incremento de severidade por detecção
 SEVERITY_INCREMENT = 0.2
 
+# Padrão → tipo de exercício que combate essa fraqueza
+_PATTERN_TO_EXERCISE = MappingProxyType({
+    PatternType.VOCAB_WEAKNESS: ExerciseType.TRANSLATION,
+    PatternType.GRAMMAR_CONFUSION: ExerciseType.FILL_BLANK,
+    PatternType.STRUCTURE_CONFUSION: ExerciseType.BUILD_SENTENCE,
+})
+
+# O resumo da tela de Progresso só muda quando os padrões mudam: fica em cache
+# por usuário e é invalidado a cada escrita em error_patterns. O TTL cobre
+# escritas feitas por fora deste processo.
+ADAPTATION_SUMMARY_CACHE_TTL_SECONDS = 60.0
+_summary_cache = TTLCache(ttl=ADAPTATION_SUMMARY_CACHE_TTL_SECONDS)
+
 
 # ─── Funções principais ────────────────────────────────────────────────────────
 
@@ -63,149 +84,120 @@ def analyze_and_update_patterns(user_id: int, db: Session) -> List[ErrorPattern]
     Returns:
         Lista de padrões ativos (atualizados ou criados)
     """
-    cutoff = datetime.utcnow() - timedelta(days=ANALYSIS_WINDOW_DAYS)
+    cutoff = utc_now() - timedelta(days=ANALYSIS_WINDOW_DAYS)
     active_patterns = []
 
+    # As taxas de erro são agregadas no banco numa única passada por tabela
+    # (GROUP BY tipo); nenhuma linha é hidratada como objeto ORM
+
     # ── Análise de ReviewLog ───────────────────────────────────────────────────
-    recent_reviews = (
-        db.query(ReviewLog)
-        .filter(ReviewLog.user_id == user_id)
-        .filter(ReviewLog.reviewed_at >= cutoff)
-        .all()
-    )
+    review_tally = _tally_reviews(user_id, cutoff, db)
+    review_count = sum(total for total, _ in review_tally.values())
 
-    if len(recent_reviews) >= MIN_REVIEWS_FOR_ANALYSIS:
-        vocab_patterns = _analyze_vocab_errors(user_id, recent_reviews, db)
-        grammar_patterns = _analyze_grammar_errors(user_id, recent_reviews, db)
-        active_patterns.extend(vocab_patterns + grammar_patterns)
+    if review_count >= MIN_REVIEWS_FOR_ANALYSIS:
+        active_patterns.extend(_maybe_emit_vocab_pattern(user_id, cutoff, review_tally, db))
+        active_patterns.extend(_maybe_emit_grammar_pattern(user_id, cutoff, review_tally, db))
 
     # ── Análise de ExerciseSubmissions ────────────────────────────────────────
-    recent_submissions = (
-        db.query(ExerciseSubmission)
-        .filter(ExerciseSubmission.user_id == user_id)
-        .filter(ExerciseSubmission.submitted_at >= cutoff)
-        .all()
-    )
+    submission_tally = _tally_submissions(user_id, cutoff, db)
+    submission_count = sum(total for total, _ in submission_tally.values())
 
-    if len(recent_submissions) >= MIN_REVIEWS_FOR_ANALYSIS:
-        structure_patterns = _analyze_structure_errors(user_id, recent_submissions, db)
-        active_patterns.extend(structure_patterns)
+    if submission_count >= MIN_REVIEWS_FOR_ANALYSIS:
+        active_patterns.extend(
+            _maybe_emit_structure_pattern(user_id, cutoff, submission_tally, db)
+        )
 
     db.commit()
+    if active_patterns:
+        invalidate_adaptation_summary(user_id)
     return active_patterns
 
 
-def _analyze_vocab_errors(
-    user_id: int, reviews: List[ReviewLog], db: Session
-) -> List[ErrorPattern]:
-    """Detecta fraqueza em vocabulário."""
-    vocab_errors = []
-    affected_cards = []
-
-    for review in reviews:
-        card = db.query(Card).filter(Card.id == review.card_id).first()
-        if card and card.card_type == CardType.VOCAB:
-            if not review.was_correct:
-                vocab_errors.append(review)
-                affected_cards.append(card.id)
-
-    vocab_reviews = [
-        r for r in reviews
-        if _get_card_type(r.card_id, db) == CardType.VOCAB
-    ]
-
-    if not vocab_reviews:
-        return []
-
-    error_rate = len(vocab_errors) / len(vocab_reviews) if vocab_reviews else 0
-
-    if error_rate >= VOCAB_ERROR_THRESHOLD:
-        pattern = _upsert_pattern(
-            user_id=user_id,
-            pattern_type=PatternType.VOCAB_WEAKNESS,
-            description=f"Taxa de erro em vocabulário: {error_rate:.0%} nas últimas revisões.",
-            affected_cards=list(set(affected_cards)),
-            db=db,
-        )
-        # Aplica penalidade SRS aos cards afetados
-        _apply_srs_penalty_to_cards(list(set(affected_cards)), 0.6, db)
-        return [pattern]
-
-    return []
-
+def _make_review_pattern_detector(
+    card_type: CardType,
+    threshold: float,
+    pattern_type: PatternType,
+    penalty: float,
+    description: str,
+):
+    """
+    Gera o detector de um padrão sobre as revisões de um tipo de card.
+    Os parâmetros ficam fixos na closure; `description` recebe {error_rate}.
+    """
+    def detect(
+        user_id: int, cutoff: datetime, tally: Dict, db: Session
+    ) -> List[ErrorPattern]:
+        total, errors = tally.get(card_type, (0, 0))
+
+        if not total:
+            return []
+
+        error_rate = errors / total
+
+        if error_rate >= threshold:
+            affected_cards = _review_error_cards(user_id, cutoff, card_type, db)
+            pattern = _upsert_pattern(
+                user_id=user_id,
+                pattern_type=pattern_type,
+                description=description.format(error_rate=error_rate),
+                affected_cards=affected_cards,
+                db=db,
+            )
+            # Aplica penalidade SRS aos cards afetados
+            _apply_srs_penalty_to_cards(affected_cards, penalty, db)
+            return [pattern]
 
-def _analyze_grammar_errors(
-    user_id: int, reviews: List[ReviewLog], db: Session
-) -> List[ErrorPattern]:
-    """Detecta confusão em estruturas gramaticais."""
-    grammar_errors = []
-    affected_cards = []
-
-    for review in reviews:
-        card_type = _get_card_type(review.card_id, db)
-        if card_type == CardType.GRAMMAR and not review.was_correct:
-            grammar_errors.append(review)
-            affected_cards.append(review.card_id)
-
-    grammar_reviews = [
-        r for r in reviews
-        if _get_card_type(r.card_id, db) == CardType.GRAMMAR
-    ]
-
-    if not grammar_reviews:
         return []
 
-    error_rate = len(grammar_errors) / len(grammar_reviews)
+    return detect
 
-    if error_rate >= GRAMMAR_ERROR_THRESHOLD:
-        pattern = _upsert_pattern(
-            user_id=user_id,
-            pattern_type=PatternType.GRAMMAR_CONFUSION,
-            description=f"Confusão em estruturas gramaticais: {error_rate:.0%} de erro.",
-            affected_cards=list(set(affected_cards)),
-            db=db,
-        )
-        _apply_srs_penalty_to_cards(list(set(affected_cards)), 0.5, db)
-        return [pattern]
 
-    return []
+# Detecta fraqueza em vocabulário
+_maybe_emit_vocab_pattern = _make_review_pattern_detector(
+    CardType.VOCAB,
+    VOCAB_ERROR_THRESHOLD,
+    PatternType.VOCAB_WEAKNESS,
+    penalty=0.6,
+    description="Taxa de erro em vocabulário: {error_rate:.0%} nas últimas revisões.",
+)
+
+# Detecta confusão em estruturas gramaticais
+_maybe_emit_grammar_pattern = _make_review_pattern_detector(
+    CardType.GRAMMAR,
+    GRAMMAR_ERROR_THRESHOLD,
+    PatternType.GRAMMAR_CONFUSION,
+    penalty=0.5,
+    description="Confusão em estruturas gramaticais: {error_rate:.0%} de erro.",
+)
 
 
-def _analyze_structure_errors(
-    user_id: int, submissions: List[ExerciseSubmission], db: Session
+def _maybe_emit_structure_pattern(
+    user_id: int, cutoff: datetime, tally: Dict, db: Session
 ) -> List[ErrorPattern]:
     """Detecta confusão na ordem de frases via exercícios build_sentence."""
-    from app.domain.models import Exercise
-
-    structure_errors = []
-    affected_cards = []
-
-    for submission in submissions:
-        exercise = db.query(Exercise).filter(
-            Exercise.id == submission.exercise_id
-        ).first()
-        if exercise and exercise.exercise_type == ExerciseType.BUILD_SENTENCE:
-            if not submission.is_correct:
-                structure_errors.append(submission)
-                if exercise.card_id:
-                    affected_cards.append(exercise.card_id)
-
-    structure_submissions = [
-        s for s in submissions
-        if _get_exercise_type(s.exercise_id, db) == ExerciseType.BUILD_SENTENCE
-    ]
-
-    if not structure_submissions:
+    total, errors = tally.get(ExerciseType.BUILD_SENTENCE, (0, 0))
+
+    if not total:
         return []
 
-    error_rate = len(structure_errors) / len(structure_submissions)
+    error_rate = errors / total
 
     if error_rate >= STRUCTURE_ERROR_THRESHOLD:
+        affected_cards = db.scalars(
+            select(Exercise.card_id)
+            .join(ExerciseSubmission, ExerciseSubmission.exercise_id == Exercise.id)
+            .where(ExerciseSubmission.user_id == user_id)
+            .where(ExerciseSubmission.submitted_at >= cutoff)
+            .where(ExerciseSubmission.is_correct.is_(False))
+            .where(Exercise.exercise_type == ExerciseType.BUILD_SENTENCE)
+            .distinct()
+            .order_by(Exercise.card_id)
+        ).all()
         pattern = _upsert_pattern(
             user_id=user_id,
             pattern_type=PatternType.STRUCTURE_CONFUSION,
             description=f"Dificuldade com ordem de frases: {error_rate:.0%} de erro.",
-            affected_cards=list(set(affected_cards)),
+            affected_cards=affected_cards,
             db=db,
         )
         return [pattern]
@@ -213,52 +205,54 @@ def _analyze_structure_errors(
     return []
 
 
-def get_recommended_exercise_type(user_id: int, db: Session) -> Optional[ExerciseType]:
+def get_recommended_exercise_type(
+    user_id: int,
+    db: Session,
+    *,
+    patterns: Optional[List[ErrorPattern]] = None,
+) -> Optional[ExerciseType]:
     """
     Retorna o tipo de exercício mais recomendado para o aluno
     com base nos padrões de erro ativos.
+    `patterns`: padrões ativos já carregados pelo chamador (evita a query).
     """
-    active_patterns = (
-        db.query(ErrorPattern)
-        .filter(ErrorPattern.user_id == user_id)
-        .filter(ErrorPattern.is_active == True)
-        .order_by(ErrorPattern.severity.desc())
-        .all()
-    )
-
-    if not active_patterns:
-        return None
-
-    top_pattern = active_patterns[0]
-
-    # Mapeia padrão → tipo de exercício que combate essa fraqueza
-    pattern_to_exercise = {
-        PatternType.VOCAB_WEAKNESS: ExerciseType.TRANSLATION,
-        PatternType.GRAMMAR_CONFUSION: ExerciseType.FILL_BLANK,
-        PatternType.STRUCTURE_CONFUSION: ExerciseType.BUILD_SENTENCE,
-    }
+    if patterns is not None:
+        if not patterns:
+            return None
+        top_type = max(patterns, key=lambda p: p.severity).pattern_type
+    else:
+        # Só o tipo do padrão mais severo — uma linha, uma coluna
+        top_type = db.scalar(
+            select(ErrorPattern.pattern_type)
+            .where(ErrorPattern.user_id == user_id)
+            .where(ErrorPattern.is_active == True)
+            .order_by(ErrorPattern.severity.desc())
+            .limit(1)
+        )
 
-    return pattern_to_exercise.get(top_pattern.pattern_type)
+    return _PATTERN_TO_EXERCISE.get(top_type)
 
 
-def get_daily_new_cards_limit(user_id: int, db: Session, default: int = 10) -> int:
+def get_daily_new_cards_limit(
+    user_id: int,
+    db: Session,
+    default: int = 10,
+    *,
+    patterns: Optional[List[ErrorPattern]] = None,
+) -> int:
     """
     Retorna o limite diário de novos cards com base nos padrões ativos.
     Se o aluno tem muitos padrões de erro severos, reduz o limite para
     priorizar consolidação (bigbang.md §7: aprender menos, aprender melhor).
+    `patterns`: padrões ativos já carregados pelo chamador (evita a query).
     """
-    active_patterns = (
-        db.query(ErrorPattern)
-        .filter(ErrorPattern.user_id == user_id)
-        .filter(ErrorPattern.is_active == True)
-        .all()
-    )
+    active_patterns = patterns if patterns is not None else _active_patterns(user_id, db)
 
     if not active_patterns:
         return default
 
     # Calcula severidade média
-    avg_severity = sum(p.severity for p in active_patterns) / len(active_patterns)
+    avg_severity = statistics.fmean(p.severity for p in active_patterns)
 
     # Reduz novos cards proporcionalmente à severidade
     # severity=0.5 → 70% do limite; severity=1.0 → 40% do limite
@@ -271,40 +265,54 @@ def resolve_pattern_if_improved(user_id: int, db: Session) -> List[ErrorPattern]
     Verifica se padrões de erro melhoraram e os marca como resolvidos.
     Um padrão é resolvido quando a taxa de erro cai abaixo de 20%.
     """
-    resolved = []
-    cutoff = datetime.utcnow() - timedelta(days=ANALYSIS_WINDOW_DAYS)
-
-    active_patterns = (
-        db.query(ErrorPattern)
-        .filter(ErrorPattern.user_id == user_id)
-        .filter(ErrorPattern.is_active == True)
-        .all()
-    )
+    cutoff = utc_now() - timedelta(days=ANALYSIS_WINDOW_DAYS)
+
+    # Taxa de erro recente de todos os padrões ativos numa única agregação:
+    # só voltam os padrões com revisões suficientes e erro abaixo de 20%
+    total = func.count(ReviewLog.id)
+    errors = func.count().filter(ReviewLog.was_correct.is_(False))
+    improved_ids = db.scalars(
+        select(ErrorPattern.id)
+        .join(ErrorPatternCard, ErrorPatternCard.pattern_id == ErrorPattern.id)
+        .join(ReviewLog, ReviewLog.card_id == ErrorPatternCard.card_id)
+        .where(ErrorPattern.user_id == user_id)
+        .where(ErrorPattern.is_active == True)
+        .where(ReviewLog.user_id == user_id)
+        .where(ReviewLog.reviewed_at >= cutoff)
+        .group_by(ErrorPattern.id)
+        .having(total >= MIN_REVIEWS_FOR_ANALYSIS)
+        .having(errors * 1.0 / total < 0.20)
+    ).all()
+
+    if not improved_ids:
+        return []
 
-    recent_reviews = (
-        db.query(ReviewLog)
-        .filter(ReviewLog.user_id == user_id)
-        .filter(ReviewLog.reviewed_at >= cutoff)
-        .all()
+    resolved = db.scalars(
+        select(ErrorPattern).where(ErrorPattern.id.in_(improved_ids))
+    ).all()
+    # Um único UPDATE em lote; "evaluate" reflete o is_active nos objetos já carregados
+    db.execute(
+        update(ErrorPattern)
+        .where(ErrorPattern.id.in_(improved_ids))
+        .values(is_active=False),
+        execution_options={"synchronize_session": "evaluate"},
     )
-
-    for pattern in active_patterns:
-        if pattern.items_affected:
-            pattern_card_ids = set(pattern.items_affected)
-            pattern_reviews = [r for r in recent_reviews if r.card_id in pattern_card_ids]
-
-            if len(pattern_reviews) >= MIN_REVIEWS_FOR_ANALYSIS:
-                error_rate = sum(1 for r in pattern_reviews if not r.was_correct) / len(pattern_reviews)
-                if error_rate < 0.20:
-                    pattern.is_active = False
-                    resolved.append(pattern)
-
     db.commit()
+    invalidate_adaptation_summary(user_id)
     return resolved
 
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 
+def _active_patterns(user_id: int, db: Session) -> List[ErrorPattern]:
+    """Padrões de erro ativos do usuário."""
+    return db.scalars(
+        select(ErrorPattern)
+        .where(ErrorPattern.user_id == user_id)
+        .where(ErrorPattern.is_active == True)
+    ).all()
+
+
 def _upsert_pattern(
     user_id: int,
     pattern_type: PatternType,
@@ -313,24 +321,20 @@ def _upsert_pattern(
     db: Session,
 ) -> ErrorPattern:
     """Cria ou atualiza um ErrorPattern."""
-    existing = (
-        db.query(ErrorPattern)
-        .filter(ErrorPattern.user_id == user_id)
-        .filter(ErrorPattern.pattern_type == pattern_type)
-        .filter(ErrorPattern.is_active == True)
-        .first()
-    )
+    existing = db.scalars(
+        select(ErrorPattern)
+        .where(ErrorPattern.user_id == user_id)
+        .where(ErrorPattern.pattern_type == pattern_type)
+        .where(ErrorPattern.is_active == True)
+        .limit(1)
+    ).first()
 
     if existing:
         existing.count += 1
         existing.severity = min(MAX_SEVERITY, existing.severity + SEVERITY_INCREMENT)
-        existing.last_seen_at = datetime.utcnow()
+        existing.last_seen_at = utc_now()
         existing.description = description
-        # Merge affected cards sem duplicar
-        current = set(existing.items_affected or [])
-        existing.items_affected = list(current | set(affected_cards))
-        db.flush()
-        return existing
+        pattern = existing  # o UPDATE vai no commit do chamador
     else:
         pattern = ErrorPattern(
             user_id=user_id,
@@ -338,66 +342,149 @@ def _upsert_pattern(
             description=description,
             count=1,
             severity=SEVERITY_INCREMENT,
-            items_affected=affected_cards,
             is_active=True,
         )
         db.add(pattern)
-        db.flush()
-        return pattern
+        db.flush([pattern])  # só o INSERT do padrão: o id é usado no vínculo abaixo
 
+    _link_pattern_cards(pattern.id, affected_cards, db)
+    return pattern
 
-def _apply_srs_penalty_to_cards(card_ids: List[int], penalty: float, db: Session):
+
+def _link_pattern_cards(pattern_id: int, card_ids: Collection[int], db: Session):
+    """Associa cards ao padrão sem duplicar (INSERT ... ON CONFLICT DO NOTHING)."""
+    if not card_ids:
+        return
+    db.execute(
+        dialect_insert(db, ErrorPatternCard)
+        .values([{"pattern_id": pattern_id, "card_id": card_id} for card_id in card_ids])
+        .on_conflict_do_nothing()
+    )
+
+
+def backfill_pattern_cards(db: Session):
     """
-    Aplica penalidade adaptativa no SRSState dos cards afetados.
-    Reduz o intervalo na próxima revisão.
+    Migra o items_affected (JSON legado) dos padrões para error_pattern_cards.
+    Idempotente: o JSON é esvaziado após a migração. Chamado no startup.
     """
-    for card_id in card_ids:
-        srs = db.query(SRSState).filter(SRSState.card_id == card_id).first()
-        if srs:
-            srs.adaptation_penalty = min(1.0, penalty)
-    db.flush()
+    legacy = db.scalars(
+        select(ErrorPattern).where(~ErrorPattern.cards.any())
+    ).all()
+    for pattern in legacy:
+        if pattern.items_affected:
+            _link_pattern_cards(pattern.id, set(pattern.items_affected), db)
+            pattern.items_affected = []
+    db.commit()
 
 
-def _get_card_type(card_id: int, db: Session) -> Optional[CardType]:
-    """Helper para obter tipo do card sem carregar o objeto completo."""
-    card = db.query(Card.card_type).filter(Card.id == card_id).first()
-    return card.card_type if card else None
+def _apply_srs_penalty_to_cards(card_ids: Collection[int], penalty: float, db: Session):
+    """
+    Aplica penalidade adaptativa no SRSState dos cards afetados.
+    Reduz o intervalo na próxima revisão.
+    """
+    if not card_ids:
+        return
+    # Um único UPDATE em lote, sem carregar os SRSStates na sessão
+    db.execute(
+        update(SRSState)
+        .where(SRSState.card_id.in_(card_ids))
+        .values(adaptation_penalty=min(1.0, penalty)),
+        execution_options={"synchronize_session": False},
+    )
 
 
-def _get_exercise_type(exercise_id: int, db: Session) -> Optional[ExerciseType]:
-    """Helper para obter tipo do exercício."""
-    from app.domain.models import Exercise
-    ex = db.query(Exercise.exercise_type).filter(Exercise.id == exercise_id).first()
-    return ex.exercise_type if ex else None
+def _tally_reviews(
+    user_id: int, cutoff: datetime, db: Session
+) -> Dict[Optional[CardType], Tuple[int, int]]:
+    """
+    {card_type: (total, erros)} das revisões na janela, numa única agregação.
+    Revisões de cards já removidos caem na chave None (contam só no total).
+    """
+    rows = db.execute(
+        select(
+            Card.card_type,
+            func.count(ReviewLog.id),
+            func.count().filter(ReviewLog.was_correct.is_(False)),
+        )
+        .select_from(ReviewLog)
+        .outerjoin(Card, Card.id == ReviewLog.card_id)
+        .where(ReviewLog.user_id == user_id)
+        .where(ReviewLog.reviewed_at >= cutoff)
+        .group_by(Card.card_type)
+    ).all()
+    return {card_type: (total, errors) for card_type, total, errors in rows}
+
+
+def _tally_submissions(
+    user_id: int, cutoff: datetime, db: Session
+) -> Dict[Optional[ExerciseType], Tuple[int, int]]:
+    """{exercise_type: (total, erros)} das submissões na janela, numa única agregação."""
+    rows = db.execute(
+        select(
+            Exercise.exercise_type,
+            func.count(ExerciseSubmission.id),
+            func.count().filter(ExerciseSubmission.is_correct.is_(False)),
+        )
+        .select_from(ExerciseSubmission)
+        .outerjoin(Exercise, Exercise.id == ExerciseSubmission.exercise_id)
+        .where(ExerciseSubmission.user_id == user_id)
+        .where(ExerciseSubmission.submitted_at >= cutoff)
+        .group_by(Exercise.exercise_type)
+    ).all()
+    return {ex_type: (total, errors) for ex_type, total, errors in rows}
+
+
+def _review_error_cards(
+    user_id: int, cutoff: datetime, card_type: CardType, db: Session
+) -> List[int]:
+    """Ids distintos dos cards do tipo com revisão errada na janela."""
+    return db.scalars(
+        select(ReviewLog.card_id)
+        .join(Card, Card.id == ReviewLog.card_id)
+        .where(ReviewLog.user_id == user_id)
+        .where(ReviewLog.reviewed_at >= cutoff)
+        .where(ReviewLog.was_correct == False)  # casa com o WHERE de ix_reviewlog_errors
+        .where(Card.card_type == card_type)
+        .distinct()
+        .order_by(ReviewLog.card_id)
+    ).all()
 
 
 def get_adaptation_summary(user_id: int, db: Session) -> Dict:
     """
     Retorna resumo das adaptações ativas para o usuário.
-    Usado na tela de Progresso.
+    Usado na tela de Progresso. Resultado em cache por usuário.
     """
-    active_patterns = (
-        db.query(ErrorPattern)
-        .filter(ErrorPattern.user_id == user_id)
-        .filter(ErrorPattern.is_active == True)
-        .all()
-    )
+    cached = _summary_cache.get(user_id)
+    if cached is not None:
+        return cached
 
-    recommended_exercise = get_recommended_exercise_type(user_id, db)
-    daily_limit = get_daily_new_cards_limit(user_id, db)
+    # Uma única query: recomendação e limite reaproveitam os padrões carregados
+    active_patterns = _active_patterns(user_id, db)
 
-    return {
+    summary = {
         "active_patterns": [
             {
                 "type": p.pattern_type,
                 "description": p.description,
                 "severity": p.severity,
                 "count": p.count,
-                "last_seen": p.last_seen_at.isoformat() if p.last_seen_at else None,
+                "last_seen": p.last_seen_at,
             }
             for p in active_patterns
         ],
-        "recommended_exercise_type": recommended_exercise,
-        "daily_new_cards_limit": daily_limit,
+        "recommended_exercise_type": get_recommended_exercise_type(
+            user_id, db, patterns=active_patterns
+        ),
+        "daily_new_cards_limit": get_daily_new_cards_limit(
+            user_id, db, patterns=active_patterns
+        ),
         "has_active_weaknesses": len(active_patterns) > 0,
     }
+    _summary_cache.set(user_id, summary)
+    return summary
+
+
+def invalidate_adaptation_summary(user_id: int) -> None:
+    """Descarta o resumo em cache do usuário (após mudança nos padrões)."""
+    _summary_cache.invalidate(lambda key: key == user_id)
@@ -8,7 +8,7 @@ Cada entidade reflete diretamente a visão do bigbang.md:
                                                ReviewLog → ErrorPattern (adaptação)
 """
 
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
@@ -17,17 +17,30 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     JSON,
     String,
     Text,
     Enum,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
 from app.database import Base
 
+# JSON em formato binário (JSONB) no Postgres; JSON texto no SQLite
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
+
+
+def utc_now() -> datetime:
+    """
+    Agora em UTC, naive — o formato das colunas DateTime do banco.
+    Substitui o `datetime.utcnow()` (depreciado desde o Python 3.12).
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 # ─── Enums ────────────────────────────────────────────────────────────────────
 
@@ -71,6 +84,11 @@ class PatternType(str, PyEnum):
 
 # ─── User ─────────────────────────────────────────────────────────────────────
 
+# Usuário corrente do MVP single-user. As rotas usam esta constante (e não o
+# literal) para o ponto de troca ficar único quando houver autenticação.
+CURRENT_USER_ID = 1
+
+
 class User(Base):
     """
     Usuário do sistema. Por ora single-user, mas estruturado para multi-user.
@@ -84,10 +102,12 @@ class User(Base):
     native_language = Column(String(10), default="pt-BR")
     created_at = Column(DateTime, server_default=func.now())
 
-    lessons = relationship("Lesson", back_populates="user")
-    srs_states = relationship("SRSState", back_populates="user")
-    review_logs = relationship("ReviewLog", back_populates="user")
-    error_patterns = relationship("ErrorPattern", back_populates="user")
+    # Coleções (aqui e nos demais modelos) não carregam sob demanda: acesso
+    # sem selectinload()/query explícita levanta erro em vez de buscar a tabela
+    lessons = relationship("Lesson", back_populates="user", lazy="raise_on_sql")
+    srs_states = relationship("SRSState", back_populates="user", lazy="raise_on_sql")
+    review_logs = relationship("ReviewLog", back_populates="user", lazy="raise_on_sql")
+    error_patterns = relationship("ErrorPattern", back_populates="user", lazy="raise_on_sql")
 
 
 # ─── Lesson ───────────────────────────────────────────────────────────────────
@@ -112,8 +132,8 @@ class Lesson(Base):
 
     user = relationship("User", back_populates="lessons")
     transcript = relationship("Transcript", back_populates="lesson", uselist=False)
-    extracted_items = relationship("ExtractedItem", back_populates="lesson")
-    cards = relationship("Card", back_populates="lesson")
+    extracted_items = relationship("ExtractedItem", back_populates="lesson", lazy="raise_on_sql")
+    cards = relationship("Card", back_populates="lesson", lazy="raise_on_sql")
 
 
 # ─── Transcript ───────────────────────────────────────────────────────────────
@@ -143,6 +163,9 @@ class ExtractedItem(Base):
     A IA não extrai tudo — seleciona o que realmente importa (bigbang.md §2).
     """
     __tablename__ = "extracted_items"
+    __table_args__ = (
+        Index("ix_extracted_items_lesson_id", "lesson_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
@@ -163,7 +186,7 @@ class ExtractedItem(Base):
     created_at = Column(DateTime, server_default=func.now())
 
     lesson = relationship("Lesson", back_populates="extracted_items")
-    cards = relationship("Card", back_populates="extracted_item")
+    cards = relationship("Card", back_populates="extracted_item", lazy="raise_on_sql")
 
 
 # ─── Card ─────────────────────────────────────────────────────────────────────
@@ -174,11 +197,14 @@ class Card(Base):
     Representa a unidade atômica de conhecimento para revisão espaçada.
     """
     __tablename__ = "cards"
+    __table_args__ = (
+        Index("ix_cards_lesson_id", "lesson_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     extracted_item_id = Column(Integer, ForeignKey("extracted_items.id"), nullable=False)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
-    card_type = Column(Enum(CardType), nullable=False)
+    card_type = Column(Enum(CardType), nullable=False, index=True)
 
     front = Column(Text, nullable=False)  # pergunta/estímulo
     back = Column(Text, nullable=False)   # resposta/informação completa
@@ -189,8 +215,8 @@ class Card(Base):
     extracted_item = relationship("ExtractedItem", back_populates="cards")
     lesson = relationship("Lesson", back_populates="cards")
     srs_state = relationship("SRSState", back_populates="card", uselist=False)
-    exercises = relationship("Exercise", back_populates="card")
-    review_logs = relationship("ReviewLog", back_populates="card")
+    exercises = relationship("Exercise", back_populates="card", lazy="raise_on_sql")
+    review_logs = relationship("ReviewLog", back_populates="card", lazy="raise_on_sql")
 
 
 # ─── SRSState ─────────────────────────────────────────────────────────────────
@@ -207,6 +233,11 @@ class SRSState(Base):
       relearning → esquecido, voltou ao aprendizado
     """
     __tablename__ = "srs_states"
+    __table_args__ = (
+        # Fila de revisão e contadores: filtram por usuário + vencimento/estado
+        Index("ix_srs_user_due", "user_id", "due_date"),
+        Index("ix_srs_user_state", "user_id", "state"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     card_id = Column(Integer, ForeignKey("cards.id"), unique=True, nullable=False)
@@ -242,6 +273,9 @@ class Exercise(Base):
     Os exercícios alimentam o motor de adaptação via respostas do aluno.
     """
     __tablename__ = "exercises"
+    __table_args__ = (
+        Index("ix_exercises_card_id", "card_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     card_id = Column(Integer, ForeignKey("cards.id"), nullable=False)
@@ -249,13 +283,13 @@ class Exercise(Base):
 
     prompt = Column(Text, nullable=False)           # enunciado do exercício
     expected_answer = Column(Text, nullable=False)  # resposta correta
-    options = Column(JSON, nullable=True)           # para múltipla escolha futura
+    options = Column(JSONVariant, nullable=True)    # para múltipla escolha futura
     context = Column(Text, nullable=True)           # contexto adicional
 
     created_at = Column(DateTime, server_default=func.now())
 
     card = relationship("Card", back_populates="exercises")
-    submissions = relationship("ExerciseSubmission", back_populates="exercise")
+    submissions = relationship("ExerciseSubmission", back_populates="exercise", lazy="raise_on_sql")
 
 
 # ─── ExerciseSubmission ───────────────────────────────────────────────────────
@@ -265,6 +299,10 @@ class ExerciseSubmission(Base):
     Resposta do usuário a um exercício. Fonte de dados para adaptação.
     """
     __tablename__ = "exercise_submissions"
+    __table_args__ = (
+        # Janela de análise do motor adaptativo: usuário + período
+        Index("ix_submission_user_time", "user_id", "submitted_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
@@ -295,6 +333,20 @@ class ReviewLog(Base):
       5 = correto e fácil
     """
     __tablename__ = "review_logs"
+    __table_args__ = (
+        # Janela de análise do motor adaptativo: usuário + período
+        Index("ix_reviewlog_user_time", "user_id", "reviewed_at"),
+        # Índice parcial só com as revisões erradas: a busca dos cards com erro
+        # na janela vira um range scan coberto (card_id incluso)
+        Index(
+            "ix_reviewlog_errors",
+            "user_id",
+            "reviewed_at",
+            "card_id",
+            sqlite_where=text("was_correct = 0"),
+            postgresql_where=text("was_correct = false"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     card_id = Column(Integer, ForeignKey("cards.id"), nullable=False)
@@ -303,8 +355,8 @@ class ReviewLog(Base):
     quality = Column(Integer, nullable=False)       # 0-5
     response_time_ms = Column(Integer, nullable=True)
     was_correct = Column(Boolean, nullable=False)   # quality >= 3
-    srs_state_before = Column(JSON, nullable=True)  # snapshot do estado antes
-    srs_state_after = Column(JSON, nullable=True)   # snapshot do estado depois
+    srs_state_before = Column(JSONVariant, nullable=True)  # snapshot do estado antes
+    srs_state_after = Column(JSONVariant, nullable=True)   # snapshot do estado depois
 
     reviewed_at = Column(DateTime, server_default=func.now())
 
@@ -325,6 +377,11 @@ class ErrorPattern(Base):
     - Ajustar quantidade de novos cards por dia
     """
     __tablename__ = "error_patterns"
+    __table_args__ = (
+        # Padrões ativos do usuário. Composto (não parcial): o filtro chega
+        # como `is_active = ?` e o SQLite não casa parâmetro com índice parcial
+        Index("ix_errorpattern_user_active", "user_id", "is_active"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -333,10 +390,29 @@ class ErrorPattern(Base):
     description = Column(Text, nullable=True)         # descrição legível do padrão
     count = Column(Integer, default=1)                # quantas vezes detectado
     severity = Column(Float, default=0.5)             # 0.0 = leve, 1.0 = crítico
-    items_affected = Column(JSON, default=list)       # lista de card_ids afetados
+    # Legado: os cards afetados vivem em error_pattern_cards. Mantida para
+    # bancos antigos, migrada por adaptation.backfill_pattern_cards()
+    items_affected = Column(JSONVariant, default=list)
     is_active = Column(Boolean, default=True)         # false = padrão resolvido
 
     first_detected_at = Column(DateTime, server_default=func.now())
     last_seen_at = Column(DateTime, server_default=func.now())
 
     user = relationship("User", back_populates="error_patterns")
+    cards = relationship("ErrorPatternCard", back_populates="pattern", lazy="raise_on_sql")
+
+
+class ErrorPatternCard(Base):
+    """
+    Associação ErrorPattern ↔ Card afetado.
+    A PK composta garante unicidade: novas detecções só inserem ids novos.
+    """
+    __tablename__ = "error_pattern_cards"
+    __table_args__ = (
+        Index("ix_error_pattern_cards_card_id", "card_id"),
+    )
+
+    pattern_id = Column(Integer, ForeignKey("error_patterns.id"), primary_key=True)
+    card_id = Column(Integer, ForeignKey("cards.id"), primary_key=True)
+
+    pattern = relationship("ErrorPattern", back_populates="cards")
@@ -12,9 +12,11 @@ Referência SM-2 original: https://www.supermemo.com/en/archives1990-2015/englis
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from math import exp
+from types import MappingProxyType
 from typing import Optional
 
-from app.domain.models import SRSCardState
+from app.domain.models import SRSCardState, utc_now
 
 
 # ─── Constantes ───────────────────────────────────────────────────────────────
@@ -41,10 +43,22 @@ LAPSE_EASE_PENALTY = 0.20
 # Redução de intervalo por penalidade adaptativa
 ADAPTATION_PENALTY_MULTIPLIER = 0.70  # 30% de redução
 
+# Variação do ease_factor por qualidade (SM-2), pré-calculada para d = 5 - q:
+# EF' = EF + (0.1 - d * (0.08 + d * 0.02))
+_EASE_DELTA = tuple(0.1 - d * (0.08 + d * 0.02) for d in range(6))
+
+# Prioridade por estado no score de urgência da fila (maior = mais urgente)
+STATE_URGENCY_PRIORITY = MappingProxyType({
+    SRSCardState.RELEARNING: 100.0,
+    SRSCardState.LEARNING: 50.0,
+    SRSCardState.REVIEW: 10.0,
+    SRSCardState.NEW: 1.0,
+})
+
 
 # ─── Dataclasses ──────────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ReviewResult:
     """Resultado de uma revisão — novo estado calculado pelo algoritmo."""
     new_state: SRSCardState
@@ -91,52 +105,30 @@ def calculate_next_review(
         ReviewResult com todos os campos atualizados
     """
     if now is None:
-        now = datetime.utcnow()
+        now = utc_now()
 
     was_correct = quality >= LAPSE_THRESHOLD
 
     # ── Atualizar ease_factor ──────────────────────────────────────────────────
-    # Fórmula SM-2: EF' = EF + (0.1 - (5-q) * (0.08 + (5-q) * 0.02))
-    new_ease_factor = ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    # Fórmula SM-2: EF' = EF + (0.1 - (5-q) * (0.08 + (5-q) * 0.02)), tabelada
+    # (quality chega validada em 0-5 pela API e por submit_review)
+    new_ease_factor = ease_factor + _EASE_DELTA[5 - quality]
     new_ease_factor = max(EASE_FACTOR_MIN, min(EASE_FACTOR_MAX, new_ease_factor))
 
     # ── Processar por estado atual ─────────────────────────────────────────────
-
-    if current_state == SRSCardState.NEW:
-        # Card novo — nunca visto. Inicia learning.
-        return _handle_new_card(
-            quality, was_correct, new_ease_factor, lapses, stability,
-            adaptation_penalty, now
-        )
-
-    elif current_state == SRSCardState.LEARNING:
-        return _handle_learning_card(
-            quality, was_correct, new_ease_factor, lapses, stability,
-            adaptation_penalty, learning_step_index, now
-        )
-
-    elif current_state == SRSCardState.REVIEW:
-        return _handle_review_card(
-            quality, was_correct, interval, new_ease_factor, repetitions,
-            lapses, stability, adaptation_penalty, now
-        )
-
-    elif current_state == SRSCardState.RELEARNING:
-        return _handle_relearning_card(
-            quality, was_correct, new_ease_factor, lapses, stability,
-            adaptation_penalty, now
-        )
-
-    # Fallback (não deve ocorrer)
-    return _handle_new_card(
-        quality, was_correct, new_ease_factor, lapses, stability,
-        adaptation_penalty, now
+    # Tabela de despacho; estado desconhecido cai no handler de card novo
+    # (não deve ocorrer)
+    handler = _STATE_HANDLERS.get(current_state, _handle_new_card)
+    return handler(
+        quality, was_correct, interval, new_ease_factor, repetitions,
+        lapses, stability, adaptation_penalty, learning_step_index, now
     )
 
 
+# Os handlers compartilham a assinatura e ignoram o que não usam
 def _handle_new_card(
-    quality, was_correct, ease_factor, lapses, stability,
-    adaptation_penalty, now
+    quality, was_correct, interval, ease_factor, repetitions,
+    lapses, stability, adaptation_penalty, learning_step_index, now
 ) -> ReviewResult:
     """Primeiro contato com o card — inicia o processo de aprendizado."""
     if was_correct:
@@ -168,16 +160,17 @@ def _handle_new_card(
 
 
 def _handle_learning_card(
-    quality, was_correct, ease_factor, lapses, stability,
-    adaptation_penalty, learning_step_index, now
+    quality, was_correct, interval, ease_factor, repetitions,
+    lapses, stability, adaptation_penalty, learning_step_index, now
 ) -> ReviewResult:
     """Card em aprendizado inicial — sobe ou desce nos learning steps."""
     if was_correct:
         next_step = learning_step_index + 1
         if next_step >= len(LEARNING_STEPS_MINUTES):
             # Completou todos os steps — gradua para review
-            interval = _apply_adaptation_penalty(
-                GRADUATING_INTERVAL_DAYS, adaptation_penalty
+            interval = (
+                GRADUATING_INTERVAL_DAYS if adaptation_penalty <= 0
+                else _apply_adaptation_penalty(GRADUATING_INTERVAL_DAYS, adaptation_penalty)
             )
             due_date = now + timedelta(days=interval)
             new_stability = max(stability, interval * 0.8)
@@ -221,7 +214,7 @@ def _handle_learning_card(
 
 def _handle_review_card(
     quality, was_correct, interval, ease_factor, repetitions,
-    lapses, stability, adaptation_penalty, now
+    lapses, stability, adaptation_penalty, learning_step_index, now
 ) -> ReviewResult:
     """Card consolidado — calcula próximo intervalo longo."""
     if was_correct:
@@ -231,8 +224,11 @@ def _handle_review_card(
         else:
             new_interval_raw = round(interval * ease_factor)
 
-        # Aplica penalidade adaptativa se existir
-        new_interval = _apply_adaptation_penalty(new_interval_raw, adaptation_penalty)
+        # Aplica penalidade adaptativa se existir (caso comum: sem penalidade)
+        new_interval = (
+            new_interval_raw if adaptation_penalty <= 0
+            else _apply_adaptation_penalty(new_interval_raw, adaptation_penalty)
+        )
         new_interval = max(1, new_interval)
 
         # Estabilidade cresce proporcionalmente ao intervalo
@@ -270,13 +266,14 @@ def _handle_review_card(
 
 
 def _handle_relearning_card(
-    quality, was_correct, ease_factor, lapses, stability,
-    adaptation_penalty, now
+    quality, was_correct, interval, ease_factor, repetitions,
+    lapses, stability, adaptation_penalty, learning_step_index, now
 ) -> ReviewResult:
     """Card em reaprendizado após lapso."""
     if was_correct:
-        interval = _apply_adaptation_penalty(
-            RELEARNING_INTERVAL_DAYS + 1, adaptation_penalty
+        interval = (
+            RELEARNING_INTERVAL_DAYS + 1 if adaptation_penalty <= 0
+            else _apply_adaptation_penalty(RELEARNING_INTERVAL_DAYS + 1, adaptation_penalty)
         )
         new_stability = max(stability, interval * 0.7)
         due_date = now + timedelta(days=interval)
@@ -305,11 +302,20 @@ def _handle_relearning_card(
         )
 
 
+_STATE_HANDLERS = MappingProxyType({
+    SRSCardState.NEW: _handle_new_card,          # nunca visto: inicia learning
+    SRSCardState.LEARNING: _handle_learning_card,
+    SRSCardState.REVIEW: _handle_review_card,
+    SRSCardState.RELEARNING: _handle_relearning_card,
+})
+
+
 def _apply_adaptation_penalty(interval: int, penalty: float) -> int:
     """
     Aplica penalidade adaptativa ao intervalo.
     penalty=0.0 → sem penalidade
     penalty=1.0 → intervalo reduzido a ADAPTATION_PENALTY_MULTIPLIER (30% menor)
+    Os handlers já testam penalty <= 0 antes de chamar (caminho comum).
     """
     if penalty <= 0:
         return interval
@@ -333,18 +339,12 @@ def get_card_urgency_score(
     - Cards com muitos lapsos têm prioridade
     """
     if now is None:
-        now = datetime.utcnow()
+        now = utc_now()
 
     base_score = 0.0
 
     # Prioridade por estado
-    state_priority = {
-        SRSCardState.RELEARNING: 100.0,
-        SRSCardState.LEARNING: 50.0,
-        SRSCardState.REVIEW: 10.0,
-        SRSCardState.NEW: 1.0,
-    }
-    base_score += state_priority.get(state, 0)
+    base_score += STATE_URGENCY_PRIORITY.get(state, 0)
 
     # Atraso em horas
     if due_date:
@@ -365,7 +365,6 @@ def calculate_retention_probability(
     Estima a probabilidade de retenção usando curva de esquecimento de Ebbinghaus.
     R = e^(-t/S) onde t = tempo desde revisão, S = estabilidade
     """
-    import math
     if stability <= 0:
         return 0.0
-    return math.exp(-days_since_review / stability)
+    return exp(-days_since_review / stability)
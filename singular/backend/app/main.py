@@ -5,15 +5,24 @@ FastAPI app com todas as rotas registradas.
 Startup:
   - Cria tabelas no banco (SQLite)
   - Verifica usuário padrão (single-user MVP)
+  - Migra cards afetados de padrões antigos (items_affected → error_pattern_cards)
+
+Shutdown:
+  - Aguarda os jobs do worker de background
 """
 
 import os
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
 
 from app.api import cards, exercises, lessons, progress
-from app.database import SessionLocal, create_tables
+from app.database import SessionLocal, create_tables, dialect_insert
+from app.domain.adaptation import backfill_pattern_cards
+from app.domain.models import CURRENT_USER_ID, User
+from app.services import worker
 
 app = FastAPI(
     title="Singular — Motor de Aprendizado Adaptativo",
@@ -24,16 +33,24 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson serializa datetime/enum nativamente e bem mais rápido que o json da stdlib
+    default_response_class=ORJSONResponse,
 )
 
 # ── CORS para o frontend React ─────────────────────────────────────────────────
+# Dev: Vite (5173) e 3000, em localhost ou 127.0.0.1 — uma regex compilada uma
+# vez. Produção: origens extras em CORS_ORIGINS, separadas por vírgula.
+DEV_ORIGIN_REGEX = r"http://(localhost|127\.0\.0\.1):(5173|3000)"
+EXTRA_ORIGINS = tuple(
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "").split(",")
+    if origin.strip()
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",  # Vite dev server
-        "http://localhost:3000",
-        "http://127.0.0.1:5173",
-    ],
+    allow_origins=EXTRA_ORIGINS,
+    allow_origin_regex=DEV_ORIGIN_REGEX,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -51,26 +68,33 @@ app.include_router(progress.router)
 def startup():
     """Inicializa banco de dados e usuário padrão."""
     create_tables()
-    _ensure_default_user()
-
-
-def _ensure_default_user():
-    """Garante que o usuário padrão (id=1) existe no banco."""
-    from app.domain.models import User
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.id == 1).first()
-        if not user:
-            user = User(
-                id=1,
-                name="Estudante",
-                email="estudante@singular.app",
-                native_language="pt-BR",
-            )
-            db.add(user)
-            db.commit()
-    finally:
-        db.close()
+    with SessionLocal() as db:
+        _ensure_default_user(db)
+        backfill_pattern_cards(db)
+
+
+@app.on_event("shutdown")
+def shutdown():
+    """Encerra o worker de background aguardando jobs em andamento."""
+    worker.shutdown(wait=True)
+
+
+def _ensure_default_user(db: Session):
+    """
+    Garante que o usuário padrão (CURRENT_USER_ID) existe no banco.
+    Um único INSERT ... ON CONFLICT DO NOTHING, sem SELECT prévio.
+    """
+    db.execute(
+        dialect_insert(db, User)
+        .values(
+            id=CURRENT_USER_ID,
+            name="Estudante",
+            email="estudante@singular.app",
+            native_language="pt-BR",
+        )
+        .on_conflict_do_nothing()
+    )
+    db.commit()
 
 
 # ── Health check ───────────────────────────────────────────────────────────────
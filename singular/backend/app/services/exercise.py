@@ -13,19 +13,26 @@ As respostas são avaliadas e alimentam o motor de adaptação.
 
 import json
 import os
+import random
 import re
+import threading
 import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 import anthropic
+import httpx
 
 from app.domain.models import Card, ExerciseType, ItemType
+from app.services.llm import get_client
 
 
 # ─── Dataclasses ──────────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GeneratedExercise:
     exercise_type: ExerciseType
     prompt: str
@@ -34,7 +41,7 @@ class GeneratedExercise:
     options: Optional[List[str]] = None  # para múltipla escolha futura
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExerciseGenerationResult:
     success: bool
     exercises: List[GeneratedExercise] = field(default_factory=list)
@@ -43,7 +50,7 @@ class ExerciseGenerationResult:
 
 # ─── Avaliação de resposta ─────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AnswerEvaluation:
     is_correct: bool
     score: float          # 0.0-1.0
@@ -87,6 +94,38 @@ FORMATO:
 }"""
 
 
+# Chamadas à API são I/O-bound: até N cards gerados em paralelo por aula
+EXERCISE_GENERATION_CONCURRENCY = 8
+
+# Teto de chamadas simultâneas no processo inteiro: pipelines concorrentes
+# (worker.PIPELINE_WORKERS) dividem as vagas em vez de somar os pools e
+# estourar o rate limit; 429s residuais ficam com o retry/backoff do SDK
+_api_slots = threading.BoundedSemaphore(EXERCISE_GENERATION_CONCURRENCY)
+
+# Resposta curta (~800 tokens): falha rápido e cai na geração local
+EXERCISE_TIMEOUT = httpx.Timeout(20.0, connect=5.0)
+
+
+def generate_exercises_for_cards(
+    requests: List[Dict],
+    concurrency: int = EXERCISE_GENERATION_CONCURRENCY,
+) -> List[ExerciseGenerationResult]:
+    """
+    Gera exercícios para vários cards, em paralelo quando há chamada à API.
+    Cada item de `requests` são os kwargs de generate_exercises_for_card;
+    os resultados voltam na mesma ordem.
+    """
+    if len(requests) <= 1 or not os.getenv("ANTHROPIC_API_KEY"):
+        # Geração local é CPU-bound e instantânea: threads só atrapalhariam
+        return [generate_exercises_for_card(**kwargs) for kwargs in requests]
+
+    with ThreadPoolExecutor(
+        max_workers=min(concurrency, len(requests)),
+        thread_name_prefix="singular-exercises",
+    ) as pool:
+        return list(pool.map(lambda kwargs: generate_exercises_for_card(**kwargs), requests))
+
+
 def generate_exercises_for_card(
     card_content: str,
     card_back: str,
@@ -108,7 +147,7 @@ def generate_exercises_for_card(
             target_language, native_language
         )
 
-    client = anthropic.Anthropic(api_key=api_key)
+    client = get_client(api_key)
 
     user_message = f"""Gere 3 exercícios para este item de {target_language} (aluno fala {native_language}):
 
@@ -121,12 +160,14 @@ Crie um exercício de cada tipo: translation, fill_blank, build_sentence.
 Retorne APENAS o JSON."""
 
     try:
-        message = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=800,
-            system=EXERCISE_SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": user_message}],
-        )
+        with _api_slots:
+            message = client.messages.create(
+                model="claude-3-haiku-20240307",
+                max_tokens=800,
+                system=EXERCISE_SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": user_message}],
+                timeout=EXERCISE_TIMEOUT,
+            )
 
         response_text = message.content[0].text.strip()
         json_text = _extract_json(response_text)
@@ -246,7 +287,7 @@ def evaluate_answer(
         )
 
     user_norm = _normalize_answer(user_answer)
-    expected_norm = _normalize_answer(expected_answer)
+    expected_norm, accepted_answers = _expected_forms(expected_answer)
 
     # Resposta exata
     if user_norm == expected_norm:
@@ -257,7 +298,6 @@ def evaluate_answer(
         )
 
     # Múltiplas respostas aceitas (separadas por /)
-    accepted_answers = [_normalize_answer(a) for a in expected_answer.split("/")]
     if user_norm in accepted_answers:
         return AnswerEvaluation(
             is_correct=True,
@@ -280,7 +320,7 @@ def _evaluate_build_sentence(
 ) -> AnswerEvaluation:
     """Avalia exercício de construção de frase — pondera ordem das palavras."""
     user_words = set(user_norm.split())
-    expected_words = set(expected_norm.split())
+    expected_words = _word_set(expected_norm)
 
     # Palavras corretas mas ordem errada
     if user_words == expected_words:
@@ -312,7 +352,7 @@ def _evaluate_build_sentence(
 
 
 def _evaluate_fill_blank(
-    user_norm: str, accepted_norms: List[str],
+    user_norm: str, accepted_norms: Tuple[str, ...],
     user_raw: str, expected_raw: str
 ) -> AnswerEvaluation:
     """Avalia completar lacuna — mais tolerante com variações."""
@@ -334,7 +374,7 @@ def _evaluate_fill_blank(
 
 
 def _evaluate_translation(
-    user_norm: str, accepted_norms: List[str],
+    user_norm: str, accepted_norms: Tuple[str, ...],
     user_raw: str, expected_raw: str
 ) -> AnswerEvaluation:
     """Avalia tradução — verifica se a resposta contém os elementos chave."""
@@ -368,20 +408,48 @@ def _evaluate_translation(
 
 # ─── Helpers ──────────────────────────────────────────────────────────────────
 
+# Compilados uma vez: a normalização roda duas ou mais vezes por resposta avaliada
+_TRAILING_PUNCT_RE = re.compile(r"[。、！？\.!?,;]$")
+_WHITESPACE_RE = re.compile(r"\s+")
+_PARENTHESIZED_RE = re.compile(r"\(([^)]+)\)")
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+
 def _normalize_answer(text: str) -> str:
     """Normaliza resposta para comparação."""
     text = text.strip().lower()
     # Remove pontuação final comum
-    text = re.sub(r"[。、！？\.!?,;]$", "", text)
+    text = _TRAILING_PUNCT_RE.sub("", text)
     # Normaliza espaços
-    text = re.sub(r"\s+", " ", text)
+    text = _WHITESPACE_RE.sub(" ", text)
     return text
 
 
+@lru_cache(maxsize=1024)
+def _expected_forms(expected_answer: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    (resposta esperada normalizada, respostas aceitas normalizadas — separadas
+    por "/"). Em cache: o mesmo exercício é avaliado a cada tentativa.
+    """
+    return (
+        _normalize_answer(expected_answer),
+        tuple(_normalize_answer(a) for a in expected_answer.split("/")),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _word_set(text: str) -> FrozenSet[str]:
+    """
+    Conjunto de palavras de uma resposta esperada normalizada. Em cache: a
+    mesma resposta é avaliada a cada tentativa do exercício.
+    """
+    return frozenset(text.split())
+
+
 def _extract_translation(back: str) -> str:
     """Extrai a tradução principal do campo back do card."""
     # O back pode ser "食べる (comer)" ou só "comer"
-    match = re.search(r"\(([^)]+)\)", back)
+    match = _PARENTHESIZED_RE.search(back)
     if match:
         return match.group(1)
     return back.split("\n")[0].strip()
@@ -389,9 +457,10 @@ def _extract_translation(back: str) -> str:
 
 def _shuffle_words(words: list, anchor: str) -> list:
     """Embaralha palavras mantendo o conteúdo principal no meio."""
-    import random
-    shuffled = words.copy()
-    random.shuffle(shuffled)
+    shuffled = random.sample(words, len(words))  # nova lista, numa passada
+    if anchor in shuffled:
+        shuffled.remove(anchor)
+        shuffled.insert(len(shuffled) // 2, anchor)
     return shuffled
 
 
@@ -416,28 +485,56 @@ def _map_exercise_type(type_str: str) -> ExerciseType:
 
 
 def _extract_json(text: str) -> str:
-    """Extrai JSON de resposta da IA."""
+    """
+    Extrai JSON de resposta da IA: o primeiro objeto {...} balanceado.
+    Uma única passada, saltando direto entre os caracteres estruturais
+    (chaves, aspas e escapes) — cobre texto livre e blocos ```json.
+    """
     text = text.strip()
-    if text.startswith("{"):
-        return text
-    if "```json" in text:
-        start = text.find("```json") + 7
-        end = text.rfind("```")
-        if end > start:
-            return text[start:end].strip()
     start = text.find("{")
-    end = text.rfind("}") + 1
-    if start >= 0 and end > start:
-        return text[start:end]
-    return text
+    if start < 0:
+        return text
+
+    depth = 0
+    in_string = False
+    escaped_at = -1  # posição do caractere escapado por "\\" dentro de string
+    for match in _JSON_TOKEN_RE.finditer(text, start):
+        pos = match.start()
+        if pos == escaped_at:
+            continue
+        char = match.group()
+        if in_string:
+            if char == "\\":
+                escaped_at = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+
+    # Objeto não fechado (resposta truncada): devolve do "{" em diante
+    return text[start:]
 
 
 def _char_similarity(s1: str, s2: str) -> float:
-    """Calcula similaridade simples por caracteres comuns."""
+    """
+    Similaridade por caracteres comuns: Jaccard de multiconjuntos, em que
+    caracteres repetidos contam quantas vezes aparecem (frases longas e CJK
+    repetem muito). Sem repetições, coincide com o Jaccard de conjuntos.
+    """
     if not s1 or not s2:
         return 0.0
     s1_chars = set(s1)
     s2_chars = set(s2)
-    intersection = s1_chars & s2_chars
-    union = s1_chars | s2_chars
-    return len(intersection) / len(union) if union else 0.0
+    if len(s1_chars) == len(s1) and len(s2_chars) == len(s2):
+        # Caminho rápido (respostas curtas): nenhum caractere repetido
+        common = len(s1_chars & s2_chars)
+    else:
+        common = sum((Counter(s1) & Counter(s2)).values())
+    # União sem materializá-la: |A ∪ B| = |A| + |B| - |A ∩ B|
+    return common / (len(s1) + len(s2) - common)
@@ -14,17 +14,23 @@ Para um transcript típico de 5min (~2000 tokens) + output (~1500 tokens),
 o custo por aula é < $0.002 (menos de um centavo).
 """
 
-import json
+import hashlib
 import os
+import re
 from dataclasses import dataclass, field
 from typing import List, Optional
 
 import anthropic
+import httpx
+from pydantic import BaseModel, ValidationError
+
+from app.cache import TTLCache
+from app.services.llm import get_client
 
 
 # ─── Dataclasses de saída ──────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedVocabItem:
     content: str           # a palavra (ex: "食べる")
     reading: str           # leitura (ex: "たべる")
@@ -35,7 +41,7 @@ class ExtractedVocabItem:
     usefulness: float      # utilidade prática
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedPhraseItem:
     content: str           # a frase completa
     reading: str           # leitura com furigana (se japonês)
@@ -45,7 +51,7 @@ class ExtractedPhraseItem:
     usefulness: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractedGrammarItem:
     content: str           # padrão gramatical (ex: "〜ます形")
     explanation: str       # explicação simples
@@ -54,7 +60,7 @@ class ExtractedGrammarItem:
     usefulness: float
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ExtractionResult:
     success: bool
     vocabulary: List[ExtractedVocabItem] = field(default_factory=list)
@@ -65,6 +71,45 @@ class ExtractionResult:
     error: Optional[str] = None
 
 
+# ─── Schema da resposta do modelo ─────────────────────────────────────────────
+# Campos ausentes recebem os mesmos defaults do parser manual anterior;
+# strings aceitam null (o modelo às vezes omite leitura/tradução assim)
+
+class _VocabPayload(BaseModel):
+    content: Optional[str] = ""
+    reading: Optional[str] = ""
+    translation: Optional[str] = ""
+    context_sentence: Optional[str] = ""
+    complexity: float = 0.5
+    frequency: float = 0.5
+    usefulness: float = 0.5
+
+
+class _PhrasePayload(BaseModel):
+    content: Optional[str] = ""
+    reading: Optional[str] = ""
+    translation: Optional[str] = ""
+    context_sentence: Optional[str] = ""
+    complexity: float = 0.5
+    usefulness: float = 0.5
+
+
+class _GrammarPayload(BaseModel):
+    content: Optional[str] = ""
+    explanation: Optional[str] = ""
+    context_sentence: Optional[str] = ""
+    complexity: float = 0.5
+    usefulness: float = 0.5
+
+
+class _ExtractionPayload(BaseModel):
+    detected_language: Optional[str] = "ja"
+    detected_level: Optional[str] = "unknown"
+    vocabulary: List[_VocabPayload] = []
+    phrases: List[_PhrasePayload] = []
+    grammar: List[_GrammarPayload] = []
+
+
 # ─── Prompt de extração ───────────────────────────────────────────────────────
 
 EXTRACTION_SYSTEM_PROMPT = """Você é um especialista em extração de conhecimento linguístico para sistemas de aprendizado.
@@ -115,6 +160,16 @@ FORMATO DE RESPOSTA (JSON estrito):
   ]
 }"""
 
+EXTRACTION_MODEL = "claude-3-haiku-20240307"
+
+# Extrações bem-sucedidas ficam em cache pelo conteúdo exato do prompt:
+# reimportar a mesma aula (ou reprocessá-la) não chama a API de novo
+EXTRACTION_CACHE_TTL_SECONDS = 30 * 24 * 3600.0
+_extraction_cache = TTLCache(ttl=EXTRACTION_CACHE_TTL_SECONDS, maxsize=64)
+
+# Resposta longa (até 2000 tokens): mais folga que o timeout padrão do cliente
+EXTRACTION_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
 
 def extract_from_transcript(
     transcript_text: str,
@@ -141,12 +196,10 @@ def extract_from_transcript(
             error="ANTHROPIC_API_KEY não configurada. Adicione no arquivo .env",
         )
 
-    client = anthropic.Anthropic(api_key=api_key)
+    client = get_client(api_key)
 
     # Trunca transcript muito longo (economiza tokens)
-    max_transcript_chars = 4000
-    if len(transcript_text) > max_transcript_chars:
-        transcript_text = transcript_text[:max_transcript_chars] + "\n[...transcript truncado...]"
+    transcript_text = _truncate_to_tokens(transcript_text, MAX_TRANSCRIPT_TOKENS)
 
     user_message = f"""Analise esta transcrição de aula de {target_language} e extraia o conhecimento linguístico essencial.
 O aluno é falante nativo de {native_language}.
@@ -156,27 +209,44 @@ TRANSCRIÇÃO:
 
 Retorne APENAS o JSON estruturado conforme as instruções. Sem explicações adicionais."""
 
+    cache_key = hashlib.sha256(
+        "\0".join((EXTRACTION_MODEL, EXTRACTION_SYSTEM_PROMPT, user_message)).encode()
+    ).hexdigest()
+    cached = _extraction_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     last_error = None
     for attempt in range(max_retries + 1):
         try:
             message = client.messages.create(
-                model="claude-3-haiku-20240307",
+                model=EXTRACTION_MODEL,
                 max_tokens=2000,
                 system=EXTRACTION_SYSTEM_PROMPT,
                 messages=[{"role": "user", "content": user_message}],
+                timeout=EXTRACTION_TIMEOUT,
             )
 
             response_text = message.content[0].text.strip()
 
             # Tenta extrair JSON mesmo se houver texto ao redor
             json_text = _extract_json_from_response(response_text)
-            data = json.loads(json_text)
 
-            return _parse_extraction_response(data)
-
-        except json.JSONDecodeError as e:
-            last_error = f"JSON inválido na tentativa {attempt + 1}: {str(e)}"
-            continue
+            # Parse + validação numa única passada (pydantic-core), sem dict intermediário
+            payload = _ExtractionPayload.model_validate_json(json_text)
+            result = _to_extraction_result(payload)
+            _extraction_cache.set(cache_key, result)
+            return result
+
+        except ValidationError as e:
+            errors = e.errors()
+            if errors[0]["type"] == "json_invalid":
+                last_error = f"JSON inválido na tentativa {attempt + 1}: {errors[0]['msg']}"
+                continue
+            return ExtractionResult(
+                success=False,
+                error=f"Erro ao parsear resposta da extração: {str(e)}",
+            )
         except anthropic.APIError as e:
             return ExtractionResult(
                 success=False,
@@ -194,88 +264,100 @@ Retorne APENAS o JSON estruturado conforme as instruções. Sem explicações ad
     )
 
 
-def _extract_json_from_response(text: str) -> str:
+# Orçamento de tokens do transcript no prompt: ~2500 de entrada deixam folga
+# para a resposta (max_tokens=2000)
+MAX_TRANSCRIPT_TOKENS = 2500
+
+# Caracteres que viram ~1 token cada (kana, kanji/hanzi, hangul, largura total);
+# nos demais a média é ~4 caracteres por token
+_DENSE_CHARS_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# Fim de frase (o delimitador fica com a frase anterior)
+_SENTENCE_END_RE = re.compile(r"(?<=[。！？!?.\n])")
+
+
+def _estimate_tokens(text: str) -> float:
+    """Estimativa local de tokens, sensível ao script (sem chamada à API)."""
+    dense = len(_DENSE_CHARS_RE.findall(text))
+    return dense + (len(text) - dense) / 4
+
+
+def _truncate_to_tokens(text: str, budget: int) -> str:
     """
-    Extrai JSON de uma resposta que pode conter texto adicional.
-    Procura pelo primeiro { e último } para isolar o JSON.
+    Corta o texto no último fim de frase que cabe em `budget` tokens.
+    Um limite fixo em caracteres cortava demais em scripts latinos
+    (~4 chars/token) e de menos em japonês (~1 char/token).
     """
-    # Tenta JSON puro primeiro
-    text = text.strip()
-    if text.startswith("{"):
+    if _estimate_tokens(text) <= budget:
         return text
 
-    # Procura bloco de código markdown
-    if "```json" in text:
-        start = text.find("```json") + 7
-        end = text.rfind("```")
-        if end > start:
-            return text[start:end].strip()
-
-    if "```" in text:
-        start = text.find("```") + 3
-        end = text.rfind("```")
-        if end > start:
-            return text[start:end].strip()
-
-    # Procura primeiro { e último }
-    start = text.find("{")
-    end = text.rfind("}") + 1
-    if start >= 0 and end > start:
-        return text[start:end]
-
-    return text
-
-
-def _parse_extraction_response(data: dict) -> ExtractionResult:
-    """Converte o dict JSON em ExtractionResult tipado."""
-    try:
-        vocabulary = []
-        for item in data.get("vocabulary", []):
-            vocabulary.append(ExtractedVocabItem(
-                content=item.get("content", ""),
-                reading=item.get("reading", ""),
-                translation=item.get("translation", ""),
-                context_sentence=item.get("context_sentence", ""),
-                complexity=float(item.get("complexity", 0.5)),
-                frequency=float(item.get("frequency", 0.5)),
-                usefulness=float(item.get("usefulness", 0.5)),
-            ))
-
-        phrases = []
-        for item in data.get("phrases", []):
-            phrases.append(ExtractedPhraseItem(
-                content=item.get("content", ""),
-                reading=item.get("reading", ""),
-                translation=item.get("translation", ""),
-                context_sentence=item.get("context_sentence", ""),
-                complexity=float(item.get("complexity", 0.5)),
-                usefulness=float(item.get("usefulness", 0.5)),
-            ))
-
-        grammar = []
-        for item in data.get("grammar", []):
-            grammar.append(ExtractedGrammarItem(
-                content=item.get("content", ""),
-                explanation=item.get("explanation", ""),
-                context_sentence=item.get("context_sentence", ""),
-                complexity=float(item.get("complexity", 0.5)),
-                usefulness=float(item.get("usefulness", 0.5)),
-            ))
+    used = 0.0
+    end = 0
+    for sentence in _SENTENCE_END_RE.split(text):
+        used += _estimate_tokens(sentence)
+        if used > budget:
+            break
+        end += len(sentence)
+    if end == 0:
+        # A primeira frase já estoura o orçamento: corte seco conservador
+        end = budget
+    return text[:end] + "\n[...transcript truncado...]"
 
-        return ExtractionResult(
-            success=True,
-            vocabulary=vocabulary,
-            phrases=phrases,
-            grammar=grammar,
-            detected_language=data.get("detected_language", "ja"),
-            detected_level=data.get("detected_level", "unknown"),
-        )
 
-    except Exception as e:
-        return ExtractionResult(
-            success=False,
-            error=f"Erro ao parsear resposta da extração: {str(e)}",
-        )
+# Do primeiro "{" ao último "}" (guloso; DOTALL atravessa quebras de linha)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+
+def _extract_json_from_response(text: str) -> str:
+    """
+    Extrai JSON de uma resposta que pode conter texto adicional.
+    Uma única busca do primeiro { ao último } — cobre JSON puro, texto ao
+    redor e blocos ```json.
+    """
+    match = _JSON_OBJECT_RE.search(text)
+    return match.group() if match else text.strip()
+
+
+def _to_extraction_result(payload: _ExtractionPayload) -> ExtractionResult:
+    """Converte a resposta validada em ExtractionResult tipado."""
+    return ExtractionResult(
+        success=True,
+        vocabulary=[
+            ExtractedVocabItem(
+                content=item.content,
+                reading=item.reading,
+                translation=item.translation,
+                context_sentence=item.context_sentence,
+                complexity=item.complexity,
+                frequency=item.frequency,
+                usefulness=item.usefulness,
+            )
+            for item in payload.vocabulary
+        ],
+        phrases=[
+            ExtractedPhraseItem(
+                content=item.content,
+                reading=item.reading,
+                translation=item.translation,
+                context_sentence=item.context_sentence,
+                complexity=item.complexity,
+                usefulness=item.usefulness,
+            )
+            for item in payload.phrases
+        ],
+        grammar=[
+            ExtractedGrammarItem(
+                content=item.content,
+                explanation=item.explanation,
+                context_sentence=item.context_sentence,
+                complexity=item.complexity,
+                usefulness=item.usefulness,
+            )
+            for item in payload.grammar
+        ],
+        detected_language=payload.detected_language,
+        detected_level=payload.detected_level,
+    )
 
 
 def get_mock_extraction() -> ExtractionResult:
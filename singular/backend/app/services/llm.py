@@ -0,0 +1,30 @@
+"""
+Cliente da API Anthropic — Singular
+Um único cliente por processo, compartilhado pela extração e pela geração
+de exercícios: o pool de conexões do httpx (keep-alive/TLS) é reaproveitado
+entre chamadas, aulas e threads de geração.
+
+Timeouts são passados por chamada (`timeout=`), que tem precedência sobre o
+timeout do cliente: cada serviço define o seu (a extração espera respostas
+mais longas que a geração de exercícios).
+"""
+
+import threading
+from typing import Optional
+
+import anthropic
+
+_client: Optional[anthropic.Anthropic] = None
+_client_lock = threading.Lock()
+
+
+def get_client(api_key: str) -> anthropic.Anthropic:
+    """Cliente Anthropic compartilhado, recriado se a chave mudar."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            _client = anthropic.Anthropic(
+                api_key=api_key,
+                max_retries=2,
+            )
+        return _client
@@ -15,15 +15,16 @@ Fluxo (bigbang.md §3):
 """
 
 import os
-from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.domain.models import (
     Card,
     CardType,
     Exercise,
+    ExerciseType,
     ExtractedItem,
     ItemType,
     Lesson,
@@ -31,10 +32,11 @@ from app.domain.models import (
     SRSCardState,
     SRSState,
     Transcript,
+    utc_now,
 )
 from app.services.exercise import (
     GeneratedExercise,
-    generate_exercises_for_card,
+    generate_exercises_for_cards,
 )
 from app.services.extraction import (
     ExtractionResult,
@@ -94,7 +96,8 @@ def run_import_pipeline(
         result.error = f"Aula {lesson_id} não encontrada."
         return result
 
-    # Marca como processando
+    # Marca como processando (commit próprio: a UI acompanha o status).
+    # Daqui em diante tudo vai numa única transação, gravada no commit final
     lesson.status = LessonStatus.PROCESSING
     db.commit()
 
@@ -120,7 +123,6 @@ def run_import_pipeline(
             lesson.language = extraction_result.detected_language
         if extraction_result.detected_level:
             lesson.level = extraction_result.detected_level
-        db.flush()
 
         # ── Step 3: Geração de Cards ───────────────────────────────────────────
         cards = _step_generate_cards(lesson, extraction_result, db)
@@ -138,7 +140,7 @@ def run_import_pipeline(
 
         # Finaliza
         lesson.status = LessonStatus.READY
-        lesson.processed_at = datetime.utcnow()
+        lesson.processed_at = utc_now()
         db.commit()
 
         result.success = True
@@ -182,8 +184,6 @@ def _step_transcription(
         if transcript_result.title and not lesson.title:
             lesson.title = transcript_result.title
 
-        db.flush()
-
     return transcript_result
 
 
@@ -207,49 +207,51 @@ def _step_extraction(
         )
 
     if extraction_result.success:
-        # Salva vocabulário
-        for vocab in extraction_result.vocabulary:
-            item = ExtractedItem(
-                lesson_id=lesson.id,
-                item_type=ItemType.VOCAB,
-                content=vocab.content,
-                reading=vocab.reading,
-                translation=vocab.translation,
-                context_sentence=vocab.context_sentence,
-                complexity=vocab.complexity,
-                frequency=vocab.frequency,
-                usefulness=vocab.usefulness,
-            )
-            db.add(item)
-
-        # Salva frases
-        for phrase in extraction_result.phrases:
-            item = ExtractedItem(
-                lesson_id=lesson.id,
-                item_type=ItemType.PHRASE,
-                content=phrase.content,
-                reading=phrase.reading,
-                translation=phrase.translation,
-                context_sentence=phrase.context_sentence,
-                complexity=phrase.complexity,
-                usefulness=phrase.usefulness,
-            )
-            db.add(item)
-
-        # Salva gramática
-        for grammar in extraction_result.grammar:
-            item = ExtractedItem(
-                lesson_id=lesson.id,
-                item_type=ItemType.GRAMMAR,
-                content=grammar.content,
-                explanation=grammar.explanation,
-                context_sentence=grammar.context_sentence,
-                complexity=grammar.complexity,
-                usefulness=grammar.usefulness,
-            )
-            db.add(item)
-
-        db.flush()
+        # Um INSERT em lote por tipo de item, direto das dicts (sem objetos ORM):
+        # _step_generate_cards relê os itens da aula do banco
+        vocab_rows = [
+            {
+                "lesson_id": lesson.id,
+                "item_type": ItemType.VOCAB,
+                "content": vocab.content,
+                "reading": vocab.reading,
+                "translation": vocab.translation,
+                "context_sentence": vocab.context_sentence,
+                "complexity": vocab.complexity,
+                "frequency": vocab.frequency,
+                "usefulness": vocab.usefulness,
+            }
+            for vocab in extraction_result.vocabulary
+        ]
+        phrase_rows = [
+            {
+                "lesson_id": lesson.id,
+                "item_type": ItemType.PHRASE,
+                "content": phrase.content,
+                "reading": phrase.reading,
+                "translation": phrase.translation,
+                "context_sentence": phrase.context_sentence,
+                "complexity": phrase.complexity,
+                "usefulness": phrase.usefulness,
+            }
+            for phrase in extraction_result.phrases
+        ]
+        grammar_rows = [
+            {
+                "lesson_id": lesson.id,
+                "item_type": ItemType.GRAMMAR,
+                "content": grammar.content,
+                "explanation": grammar.explanation,
+                "context_sentence": grammar.context_sentence,
+                "complexity": grammar.complexity,
+                "usefulness": grammar.usefulness,
+            }
+            for grammar in extraction_result.grammar
+        ]
+
+        for rows in (vocab_rows, phrase_rows, grammar_rows):
+            if rows:
+                db.execute(insert(ExtractedItem), rows)  # executemany
 
     return extraction_result
 
@@ -262,23 +264,40 @@ def _step_generate_cards(
     """
     Step 3: Gera Cards a partir dos ExtractedItems.
     Para cada item, cria um Card com front/back significativos.
+
+    Todos os cards saem num único INSERT ... RETURNING; os passos seguintes
+    recebem só as linhas (id, card_type, back, extracted_item_id). Cada linha
+    carrega o próprio extracted_item_id, então a ordem do RETURNING não importa
+    (pedir a ordem dos parâmetros faria o SQLite voltar a um INSERT por card).
     """
-    cards = []
     extracted_items = db.query(ExtractedItem).filter(
         ExtractedItem.lesson_id == lesson.id
     ).all()
 
+    card_rows = []
     for item in extracted_items:
-        card = _create_card_from_item(item, lesson.id, db)
-        if card:
-            cards.append(card)
-
-    db.flush()
-    return cards
+        row = _card_values_from_item(item, lesson.id)
+        if row:
+            card_rows.append(row)
+
+    if not card_rows:
+        return []
+    # Core (tabela, não a entidade): o bulk INSERT do ORM quebra o lote a cada
+    # troca de coluna None/não-None (hint), virando um INSERT por tipo de card
+    table = Card.__table__
+    return db.execute(
+        insert(table).returning(
+            table.c.id,
+            table.c.card_type,
+            table.c.back,
+            table.c.extracted_item_id,
+        ),
+        card_rows,
+    ).all()
 
 
-def _create_card_from_item(item: ExtractedItem, lesson_id: int, db: Session) -> Optional[Card]:
-    """Cria um Card a partir de um ExtractedItem."""
+def _card_values_from_item(item: ExtractedItem, lesson_id: int) -> Optional[Dict]:
+    """Colunas do Card gerado a partir de um ExtractedItem."""
     if item.item_type == ItemType.VOCAB:
         # Front: palavra + leitura | Back: tradução + contexto
         front = item.content
@@ -289,14 +308,8 @@ def _create_card_from_item(item: ExtractedItem, lesson_id: int, db: Session) ->
         if item.context_sentence:
             back += f"\n\n例文: {item.context_sentence}"
 
-        card = Card(
-            extracted_item_id=item.id,
-            lesson_id=lesson_id,
-            card_type=CardType.VOCAB,
-            front=front,
-            back=back,
-            hint=item.reading,
-        )
+        card_type = CardType.VOCAB
+        hint = item.reading
 
     elif item.item_type == ItemType.PHRASE:
         front = item.content
@@ -304,13 +317,8 @@ def _create_card_from_item(item: ExtractedItem, lesson_id: int, db: Session) ->
         if item.context_sentence:
             back += f"\n\n使い方: {item.context_sentence}"
 
-        card = Card(
-            extracted_item_id=item.id,
-            lesson_id=lesson_id,
-            card_type=CardType.PHRASE,
-            front=front,
-            back=back,
-        )
+        card_type = CardType.PHRASE
+        hint = None
 
     elif item.item_type == ItemType.GRAMMAR:
         front = f"📝 {item.content}"
@@ -318,19 +326,19 @@ def _create_card_from_item(item: ExtractedItem, lesson_id: int, db: Session) ->
         if item.context_sentence:
             back += f"\n\n例: {item.context_sentence}"
 
-        card = Card(
-            extracted_item_id=item.id,
-            lesson_id=lesson_id,
-            card_type=CardType.GRAMMAR,
-            front=front,
-            back=back,
-            hint=item.context_sentence,
-        )
+        card_type = CardType.GRAMMAR
+        hint = item.context_sentence
     else:
         return None
 
-    db.add(card)
-    return card
+    return {
+        "extracted_item_id": item.id,
+        "lesson_id": lesson_id,
+        "card_type": card_type,
+        "front": front,
+        "back": back,
+        "hint": hint,
+    }
 
 
 def _step_generate_exercises(
@@ -344,34 +352,42 @@ def _step_generate_exercises(
     Para MVP, gera para vocab e phrase (grammar tem exercício implícito no card).
     """
     total = 0
+    to_generate = []  # (card, kwargs do gerador)
+
+    # Itens de todos os cards numa única query (em vez de uma por card)
+    items = {
+        item.id: item
+        for item in db.query(ExtractedItem).filter(
+            ExtractedItem.id.in_([card.extracted_item_id for card in cards])
+        )
+    }
 
     for card in cards:
+        item = items.get(card.extracted_item_id)
+        if not item:
+            continue
+
         # Pula cards de gramática para economizar tokens (o card já é o exercício)
         if card.card_type == CardType.GRAMMAR and not use_mock:
             # Gera apenas 1 exercício de fill_blank para gramática
-            item = db.query(ExtractedItem).filter(
-                ExtractedItem.id == card.extracted_item_id
-            ).first()
-            if item:
-                _create_single_exercise_for_grammar(card, item, db)
-                total += 1
+            _create_single_exercise_for_grammar(card, item, db)
+            total += 1
             continue
 
-        item = db.query(ExtractedItem).filter(
-            ExtractedItem.id == card.extracted_item_id
-        ).first()
-        if not item:
-            continue
+        to_generate.append((card, {
+            "card_content": item.content,
+            "card_back": card.back,
+            "card_type": card.card_type.value,
+            "context_sentence": item.context_sentence or "",
+            "target_language": lesson.language or "ja",
+            "native_language": "pt-BR",
+        }))
 
-        result = generate_exercises_for_card(
-            card_content=item.content,
-            card_back=card.back,
-            card_type=card.card_type.value,
-            context_sentence=item.context_sentence or "",
-            target_language=lesson.language or "ja",
-            native_language="pt-BR",
-        )
+    # As chamadas ao gerador rodam em paralelo; a sessão do banco só é
+    # usada aqui, na thread do pipeline
+    results = generate_exercises_for_cards([kwargs for _, kwargs in to_generate])
 
+    for (card, _), result in zip(to_generate, results):
         if result.success:
             for gen_ex in result.exercises:
                 exercise = Exercise(
@@ -385,14 +401,11 @@ def _step_generate_exercises(
                 db.add(exercise)
                 total += 1
 
-    db.flush()
     return total
 
 
-def _create_single_exercise_for_grammar(card: Card, item: ExtractedItem, db: Session):
+def _create_single_exercise_for_grammar(card, item: ExtractedItem, db: Session):
     """Cria um exercício de fill_blank para card de gramática."""
-    from app.domain.models import ExerciseType
-
     if item.context_sentence and item.content:
         # Cria fill_blank com a frase de exemplo
         exercise = Exercise(
@@ -410,21 +423,24 @@ def _step_init_srs(cards: list, user_id: int, db: Session):
     Step 5: Inicializa o SRSState para cada card.
     Todos começam como NEW com due_date = agora (disponível imediatamente).
     """
-    for card in cards:
-        srs = SRSState(
-            card_id=card.id,
-            user_id=user_id,
-            interval=0,
-            ease_factor=2.5,
-            repetitions=0,
-            lapses=0,
-            state=SRSCardState.NEW,
-            due_date=datetime.utcnow(),  # disponível imediatamente
-            stability=1.0,
-            adaptation_penalty=0.0,
-        )
-        db.add(srs)
-    db.flush()
+    if not cards:
+        return
+    now = utc_now()  # disponível imediatamente
+    db.execute(insert(SRSState), [
+        {
+            "card_id": card.id,
+            "user_id": user_id,
+            "interval": 0,
+            "ease_factor": 2.5,
+            "repetitions": 0,
+            "lapses": 0,
+            "state": SRSCardState.NEW,
+            "due_date": now,
+            "stability": 1.0,
+            "adaptation_penalty": 0.0,
+        }
+        for card in cards
+    ])
 
 
 def _mark_error(lesson: Lesson, error_message: str, db: Session):
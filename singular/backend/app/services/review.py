@@ -11,10 +11,12 @@ Responsabilidades:
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-from sqlalchemy import and_, func
+from sqlalchemy import Float, case, func, or_, select, union_all
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
 
-from app.domain.adaptation import analyze_and_update_patterns
+from app.cache import TTLCache
 from app.domain.models import (
     Card,
     ExtractedItem,
@@ -23,13 +25,19 @@ from app.domain.models import (
     SRSCardState,
     SRSState,
     User,
+    utc_now,
 )
 from app.domain.srs import (
+    STATE_URGENCY_PRIORITY,
     calculate_next_review,
     calculate_retention_probability,
-    get_card_urgency_score,
 )
 
+# A UI consulta a fila em polling: respostas idênticas dentro de 2s saem do
+# cache. Chave: (user_id, limit, include_new); invalidado a cada revisão.
+DUE_CARDS_CACHE_TTL_SECONDS = 2.0
+_due_cards_cache = TTLCache(ttl=DUE_CARDS_CACHE_TTL_SECONDS)
+
 
 # ─── Fila de revisão ──────────────────────────────────────────────────────────
 
@@ -38,6 +46,7 @@ def get_due_cards(
     db: Session,
     limit: int = 20,
     include_new: bool = True,
+    include_lesson_title: bool = False,
 ) -> List[Dict]:
     """
     Retorna cards devidos para revisão, ordenados por urgência.
@@ -46,81 +55,155 @@ def get_due_cards(
     - Cards com due_date <= agora (atrasados ou no prazo)
     - Cards NEW (se include_new=True e dentro do limite diário)
 
+    O título da aula (JOIN com lessons) só é buscado com include_lesson_title=True;
+    caso contrário "lesson_title" vem None.
+
     Returns:
         Lista de dicts com card + srs_state + item info
     """
-    now = datetime.utcnow()
-
-    # Query: SRSState due + Card + ExtractedItem
-    due_states = (
-        db.query(SRSState)
-        .filter(SRSState.user_id == user_id)
-        .filter(
-            and_(
-                SRSState.due_date <= now,
-                SRSState.state != SRSCardState.NEW if not include_new else True,
-            )
-        )
-        .all()
+    cache_key = (user_id, limit, include_new, include_lesson_title)
+    cached = _due_cards_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    now = utc_now()
+
+    # Fila numa única query: UNION ALL dos cards vencidos com os primeiros
+    # novos da sessão, ordenada por urgência e cortada no LIMIT pelo banco
+    due = (
+        select(SRSState.id)
+        .where(SRSState.user_id == user_id)
+        .where(SRSState.due_date <= now)
     )
+    if not include_new:
+        due = due.where(SRSState.state != SRSCardState.NEW)
+    candidates = due
 
     if include_new:
-        new_states = (
-            db.query(SRSState)
-            .filter(SRSState.user_id == user_id)
-            .filter(SRSState.state == SRSCardState.NEW)
+        first_new = (
+            select(SRSState.id)
+            .where(SRSState.user_id == user_id)
+            .where(SRSState.state == SRSCardState.NEW)
+            .order_by(SRSState.id)
             .limit(10)  # máximo de novos por sessão
-            .all()
         )
-        # Combina sem duplicar
-        all_ids = {s.id for s in due_states}
-        for s in new_states:
-            if s.id not in all_ids:
-                due_states.append(s)
-
-    # Ordena por urgência
-    due_states.sort(
-        key=lambda s: get_card_urgency_score(s.due_date, s.state, s.lapses, now),
-        reverse=True,
+        # Combina sem duplicar: novos já vencidos vêm do primeiro ramo
+        new_not_due = (
+            select(SRSState.id)
+            .where(SRSState.id.in_(first_new))
+            .where(or_(SRSState.due_date.is_(None), SRSState.due_date > now))
+        )
+        candidates = union_all(due, new_not_due)
+
+    candidate_ids = candidates.subquery()
+    # Card, item (e aula, se pedida) vêm no mesmo SELECT (um round-trip para a
+    # fila inteira). Só colunas, sem hidratar entidades: a fila vira dicts logo
+    # em seguida
+    queue = (
+        select(
+            SRSState.id.label("srs_id"),
+            SRSState.state,
+            SRSState.interval,
+            SRSState.lapses,
+            SRSState.due_date,
+            SRSState.last_reviewed_at,
+            SRSState.stability,
+            Card.id.label("card_id"),
+            Card.card_type,
+            Card.front,
+            Card.back,
+            Card.hint,
+            ExtractedItem.item_type,
+            ExtractedItem.context_sentence,
+        )
+        .join(candidate_ids, SRSState.id == candidate_ids.c.id)
+        .join(Card, Card.id == SRSState.card_id)
+        .outerjoin(ExtractedItem, ExtractedItem.id == Card.extracted_item_id)
+        .order_by(_urgency_score_expr(now).desc(), SRSState.id)
+        .limit(limit)
     )
+    if include_lesson_title:
+        queue = (
+            queue.add_columns(Lesson.title.label("lesson_title"))
+            .outerjoin(Lesson, Lesson.id == Card.lesson_id)
+        )
+    rows = db.execute(queue).all()
 
     result = []
-    for srs in due_states[:limit]:
-        card = db.query(Card).filter(Card.id == srs.card_id).first()
-        if not card:
-            continue
-
-        item = db.query(ExtractedItem).filter(
-            ExtractedItem.id == card.extracted_item_id
-        ).first()
-
-        lesson = db.query(Lesson).filter(Lesson.id == card.lesson_id).first()
-
+    for row in rows:
         retention = calculate_retention_probability(
-            days_since_review=(now - srs.last_reviewed_at).days if srs.last_reviewed_at else 0,
-            stability=srs.stability,
+            days_since_review=(now - row.last_reviewed_at).days if row.last_reviewed_at else 0,
+            stability=row.stability,
         )
 
         result.append({
-            "srs_id": srs.id,
-            "card_id": card.id,
-            "card_type": card.card_type.value,
-            "front": card.front,
-            "back": card.back,
-            "hint": card.hint,
-            "state": srs.state.value,
-            "interval": srs.interval,
-            "lapses": srs.lapses,
+            "srs_id": row.srs_id,
+            "card_id": row.card_id,
+            "card_type": row.card_type.value,
+            "front": row.front,
+            "back": row.back,
+            "hint": row.hint,
+            "state": row.state.value,
+            "interval": row.interval,
+            "lapses": row.lapses,
             "retention_probability": round(retention, 2),
-            "due_date": srs.due_date.isoformat() if srs.due_date else None,
-            "lesson_title": lesson.title if lesson else None,
-            "item_type": item.item_type.value if item else None,
-            "context_sentence": item.context_sentence if item else None,
+            "due_date": row.due_date,
+            "lesson_title": row.lesson_title if include_lesson_title else None,
+            "item_type": row.item_type.value if row.item_type else None,
+            "context_sentence": row.context_sentence,
         })
 
+    _due_cards_cache.set(cache_key, result)
     return result
 
 
+def _urgency_score_expr(now: datetime):
+    """
+    Espelho em SQL de srs.get_card_urgency_score (score maior = mais urgente):
+    prioridade por estado + 2 pontos por hora de atraso + 5 por lapso.
+    """
+    state_priority = case(
+        *(
+            (SRSState.state == state, priority)
+            for state, priority in STATE_URGENCY_PRIORITY.items()
+        ),
+        else_=0.0,
+    )
+    delay_hours = _hours_between(SRSState.due_date, now)
+    delay_score = case((delay_hours > 0, delay_hours * 2), else_=0.0)
+    return state_priority + delay_score + func.coalesce(SRSState.lapses, 0) * 5
+
+
+class _hours_between(FunctionElement):
+    """Horas decorridas de `start` até `end` (datetimes), compilado por dialeto."""
+    type = Float()
+    name = "hours_between"
+    inherit_cache = True
+
+
+@compiles(_hours_between)
+def _hours_between_sqlite(element, compiler, **kw):
+    start, end = element.clauses
+    return "((julianday(%s) - julianday(%s)) * 24)" % (
+        compiler.process(end, **kw),
+        compiler.process(start, **kw),
+    )
+
+
+@compiles(_hours_between, "postgresql")
+def _hours_between_postgresql(element, compiler, **kw):
+    start, end = element.clauses
+    return "(EXTRACT(EPOCH FROM (%s - %s)) / 3600)" % (
+        compiler.process(end, **kw),
+        compiler.process(start, **kw),
+    )
+
+
+def invalidate_due_cards(user_id: int) -> None:
+    """Descarta a fila em cache do usuário (após revisão ou remoção de cards)."""
+    _due_cards_cache.invalidate(lambda key: key[0] == user_id)
+
+
 def submit_review(
     user_id: int,
     card_id: int,
@@ -142,6 +225,7 @@ def submit_review(
         Dict com novo estado do SRS e feedback
     """
     quality = max(0, min(5, quality))  # garante range 0-5
+    now = utc_now()  # um único instante para due_date e last_reviewed_at
 
     srs = (
         db.query(SRSState)
@@ -172,6 +256,7 @@ def submit_review(
         lapses=srs.lapses,
         stability=srs.stability,
         adaptation_penalty=srs.adaptation_penalty,
+        now=now,
     )
 
     # Atualiza SRSState
@@ -182,7 +267,7 @@ def submit_review(
     srs.lapses = review_result.new_lapses
     srs.stability = review_result.new_stability
     srs.due_date = review_result.new_due_date
-    srs.last_reviewed_at = datetime.utcnow()
+    srs.last_reviewed_at = now
     # Reset penalidade após revisão bem-sucedida
     if review_result.was_correct:
         srs.adaptation_penalty = max(0.0, srs.adaptation_penalty - 0.1)
@@ -208,35 +293,33 @@ def submit_review(
     )
     db.add(log)
     db.commit()
-
-    # Atualiza padrões de erro (análise assíncrona simplificada)
-    try:
-        analyze_and_update_patterns(user_id, db)
-    except Exception:
-        pass  # não bloqueia a revisão se análise falhar
+    invalidate_due_cards(user_id)
 
     return {
         "card_id": card_id,
         "was_correct": review_result.was_correct,
         "new_state": review_result.new_state.value,
         "new_interval": review_result.new_interval,
-        "next_due": review_result.new_due_date.isoformat(),
+        "next_due": review_result.new_due_date,
         "quality": quality,
         "feedback": _quality_feedback(quality),
     }
 
 
+# Feedback por qualidade, indexado por 0-5
+_QUALITY_FEEDBACK = (
+    "Não lembrou. O card voltará em breve.",
+    "Errou, mas a resposta era familiar.",
+    "Errou, mas reconheceu a resposta correta.",
+    "Correto, mas foi difícil. Continue praticando!",
+    "Bom! Com um pouco de hesitação.",
+    "Perfeito! Resposta fácil e rápida.",
+)
+
+
 def _quality_feedback(quality: int) -> str:
-    """Gera feedback textual baseado na qualidade."""
-    messages = {
-        0: "Não lembrou. O card voltará em breve.",
-        1: "Errou, mas a resposta era familiar.",
-        2: "Errou, mas reconheceu a resposta correta.",
-        3: "Correto, mas foi difícil. Continue praticando!",
-        4: "Bom! Com um pouco de hesitação.",
-        5: "Perfeito! Resposta fácil e rápida.",
-    }
-    return messages.get(quality, "Revisão registrada.")
+    """Gera feedback textual baseado na qualidade (já limitada a 0-5 pelo chamador)."""
+    return _QUALITY_FEEDBACK[quality]
 
 
 # ─── Métricas de progresso ─────────────────────────────────────────────────────
@@ -246,38 +329,47 @@ def get_progress_stats(user_id: int, db: Session) -> Dict:
     Retorna estatísticas de progresso do aluno.
     Usado na tela de Progresso.
     """
-    now = datetime.utcnow()
+    now = utc_now()
     week_ago = now - timedelta(days=7)
 
-    # Total de cards por estado
+    # Por estado, numa única agregação: total de cards, "dominados" (interval
+    # > 7 dias — só contam no estado REVIEW) e devidos agora
     states = (
-        db.query(SRSState.state, func.count(SRSState.id))
+        db.query(
+            SRSState.state,
+            func.count(),
+            func.count().filter(SRSState.interval > 7),
+            func.count().filter(SRSState.due_date <= now),
+        )
         .filter(SRSState.user_id == user_id)
         .group_by(SRSState.state)
         .all()
     )
-    cards_by_state = {state.value: count for state, count in states}
-
-    # Total de revisões (últimos 7 dias)
-    recent_reviews = (
-        db.query(ReviewLog)
+    cards_by_state = {state.value: total for state, total, _, _ in states}
+    mastered = sum(
+        long_interval for state, _, long_interval, _ in states
+        if state == SRSCardState.REVIEW
+    )
+    due_now = sum(due for _, _, _, due in states)
+
+    # Revisões e acertos dos últimos 7 dias, por dia, numa única agregação:
+    # os totais da janela são a soma dos dias (inclui o dia parcial de week_ago)
+    review_day = func.date(ReviewLog.reviewed_at)
+    recent_by_day = (
+        db.query(
+            review_day,
+            func.count(),
+            func.count().filter(ReviewLog.was_correct.is_(True)),
+        )
         .filter(ReviewLog.user_id == user_id)
         .filter(ReviewLog.reviewed_at >= week_ago)
+        .group_by(review_day)
         .all()
     )
-
-    total_recent = len(recent_reviews)
-    correct_recent = sum(1 for r in recent_reviews if r.was_correct)
+    total_recent = sum(total for _, total, _ in recent_by_day)
+    correct_recent = sum(correct for _, _, correct in recent_by_day)
     accuracy_7d = (correct_recent / total_recent * 100) if total_recent > 0 else 0
 
-    # Cards devidos agora
-    due_now = (
-        db.query(SRSState)
-        .filter(SRSState.user_id == user_id)
-        .filter(SRSState.due_date <= now)
-        .count()
-    )
-
     # Aulas importadas
     total_lessons = (
         db.query(Lesson)
@@ -285,35 +377,34 @@ def get_progress_stats(user_id: int, db: Session) -> Dict:
         .count()
     )
 
-    # Vocabulário "dominado" (estado REVIEW com interval > 7 dias)
-    mastered = (
-        db.query(SRSState)
+    # Taxa de retenção estimada (média das probabilidades)
+    # (dias desde a revisão calculados no banco — sem converter um datetime
+    # por linha em Python —, lidos em blocos de 500 linhas e somados em fluxo)
+    reviewed_states = (
+        db.query(
+            _hours_between(SRSState.last_reviewed_at, now) / 24,
+            SRSState.stability,
+        )
         .filter(SRSState.user_id == user_id)
-        .filter(SRSState.state == SRSCardState.REVIEW)
-        .filter(SRSState.interval > 7)
-        .count()
+        .filter(SRSState.last_reviewed_at.is_not(None))
+        .filter(SRSState.stability > 0)
+        .yield_per(500)
     )
+    retention_sum = 0.0
+    reviewed_count = 0
+    for days, stability in reviewed_states:
+        retention_sum += calculate_retention_probability(days, stability)
+        reviewed_count += 1
 
-    # Taxa de retenção estimada (média das probabilidades)
-    all_states = db.query(SRSState).filter(SRSState.user_id == user_id).all()
-    retention_probs = []
-    for srs in all_states:
-        if srs.last_reviewed_at and srs.stability > 0:
-            days = (now - srs.last_reviewed_at).total_seconds() / 86400
-            prob = calculate_retention_probability(days, srs.stability)
-            retention_probs.append(prob)
-
-    avg_retention = (sum(retention_probs) / len(retention_probs) * 100) if retention_probs else 0
+    avg_retention = (retention_sum / reviewed_count * 100) if reviewed_count else 0
 
     # Revisões por dia dos últimos 7 dias
+    # date() devolve texto ISO no SQLite e `date` no PostgreSQL: str() normaliza
+    counts_by_day = {str(day): total for day, total, _ in recent_by_day}
     daily_reviews = {}
     for i in range(7):
-        day = (now - timedelta(days=i)).date()
-        count = sum(
-            1 for r in recent_reviews
-            if r.reviewed_at.date() == day
-        )
-        daily_reviews[day.isoformat()] = count
+        day = (now - timedelta(days=i)).date().isoformat()
+        daily_reviews[day] = counts_by_day.get(day, 0)
 
     return {
         "total_cards": sum(cards_by_state.values()),
@@ -21,10 +21,12 @@ from youtube_transcript_api import (
     YouTubeTranscriptApi,
 )
 
+from app.cache import TTLCache
+
 
 # ─── Dataclass de resultado ────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TranscriptResult:
     success: bool
     text: str                        # texto completo concatenado
@@ -35,24 +37,32 @@ class TranscriptResult:
 
 # ─── Extração de video_id ──────────────────────────────────────────────────────
 
+# watch?v=, youtu.be/, shorts/ e embed/ numa única alternância pré-compilada
+_VIDEO_ID_RE = re.compile(
+    r"(?:v=|youtu\.be/|youtube\.com/(?:shorts|embed)/)([A-Za-z0-9_-]{11})"
+)
+
+
 def extract_video_id(url: str) -> Optional[str]:
     """
     Extrai o video_id de diferentes formatos de URL do YouTube.
-    Suporta: youtube.com/watch?v=, youtu.be/, youtube.com/shorts/
+    Suporta: youtube.com/watch?v=, youtu.be/, youtube.com/shorts/, youtube.com/embed/
     """
-    patterns = [
-        r"(?:v=|youtu\.be/|youtube\.com/shorts/)([A-Za-z0-9_-]{11})",
-        r"youtube\.com/embed/([A-Za-z0-9_-]{11})",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
 
 
 # ─── Funções principais ────────────────────────────────────────────────────────
 
+# Idiomas tentados, em ordem, quando não há transcript no idioma preferencial
+FALLBACK_LANGUAGES = ("ja", "en", "pt", "pt-BR", "pt-PT")
+
+# Transcripts obtidos com sucesso ficam em cache por vídeo e idioma: reprocessar
+# a aula (ou reimportar a mesma URL) não busca no YouTube de novo
+TRANSCRIPT_CACHE_TTL_SECONDS = 24 * 3600.0
+_transcript_cache = TTLCache(ttl=TRANSCRIPT_CACHE_TTL_SECONDS, maxsize=64)
+
+
 def get_transcript(url: str, preferred_language: str = "ja") -> TranscriptResult:
     """
     Obtém o transcript de um vídeo do YouTube.
@@ -72,28 +82,21 @@ def get_transcript(url: str, preferred_language: str = "ja") -> TranscriptResult
             error="URL inválida. Certifique-se de usar um link do YouTube válido.",
         )
 
+    cache_key = (video_id, preferred_language)
+    cached = _transcript_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
 
-        # Tenta idioma preferencial primeiro, depois qualquer disponível
-        transcript = None
-        language_used = None
-
+        # Idioma preferencial e alternativos comuns numa única busca (a
+        # biblioteca tenta a lista em ordem); depois, qualquer disponível
+        languages = list(dict.fromkeys([preferred_language, *FALLBACK_LANGUAGES]))
         try:
-            transcript = transcript_list.find_transcript([preferred_language])
-            language_used = preferred_language
+            transcript = transcript_list.find_transcript(languages)
         except NoTranscriptFound:
-            # Tenta idiomas alternativos comuns
-            fallback_languages = ["ja", "en", "pt", "pt-BR", "pt-PT"]
-            for lang in fallback_languages:
-                if lang == preferred_language:
-                    continue
-                try:
-                    transcript = transcript_list.find_transcript([lang])
-                    language_used = lang
-                    break
-                except NoTranscriptFound:
-                    continue
+            transcript = None
 
         if not transcript:
             # Pega qualquer transcript disponível
@@ -105,7 +108,6 @@ def get_transcript(url: str, preferred_language: str = "ja") -> TranscriptResult
                     error="Nenhum transcript disponível para este vídeo.",
                 )
             transcript = available[0]
-            language_used = transcript.language_code
 
         # Busca e concatena os segmentos
         segments = transcript.fetch()
@@ -118,11 +120,13 @@ def get_transcript(url: str, preferred_language: str = "ja") -> TranscriptResult
                 error="O transcript foi obtido mas está vazio.",
             )
 
-        return TranscriptResult(
+        result = TranscriptResult(
             success=True,
             text=full_text,
-            language=language_used,
+            language=transcript.language_code,
         )
+        _transcript_cache.set(cache_key, result)
+        return result
 
     except TranscriptsDisabled:
         return TranscriptResult(
@@ -144,24 +148,21 @@ def get_transcript(url: str, preferred_language: str = "ja") -> TranscriptResult
         )
 
 
+# Marcadores de música e outros artefatos comuns: segmento inteiro entre [] ou ()
+_ARTIFACT_RE = re.compile(r"\[.*\]|\(.*\)", re.DOTALL)
+
+
 def _segments_to_text(segments: list) -> str:
     """
     Converte lista de segmentos {text, start, duration} em texto corrido.
     Preserva a pontuação e capitalização originais.
     """
-    texts = []
-    for segment in segments:
-        text = segment.get("text", "").strip()
-        if text:
-            # Remove marcadores de música e outros artefatos comuns
-            if text.startswith("[") and text.endswith("]"):
-                continue
-            if text.startswith("(") and text.endswith(")"):
-                continue
-            texts.append(text)
-
-    # Junta com espaço, evitando duplicar espaços
-    return " ".join(texts)
+    # Junta com espaço, evitando duplicar espaços; descarta vazios e artefatos
+    return " ".join(
+        text
+        for text in (segment.get("text", "").strip() for segment in segments)
+        if text and not _ARTIFACT_RE.fullmatch(text)
+    )
 
 
 def get_mock_transcript(language: str = "ja") -> TranscriptResult:
@@ -0,0 +1,112 @@
+"""
+Worker de Background — Singular
+Executor dedicado para jobs longos ou fora do caminho crítico:
+  - pipeline de importação de aulas
+  - análise de padrões de erro (debounced por usuário)
+
+Os jobs rodam em threads próprias, fora do threadpool do FastAPI onde
+rodam as rotas síncronas: um pipeline lento (transcrição + LLM) não ocupa
+workers da API. Cada job abre a própria sessão do banco.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from app.database import SessionLocal
+from app.domain.adaptation import analyze_and_update_patterns
+from app.services.pipeline import run_import_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Poucos workers: o pipeline é I/O-bound e cada um segura escritas no SQLite
+PIPELINE_WORKERS = 2
+
+# Janela de coalescência da análise: uma rajada de respostas erradas gera
+# uma única análise, rodada PATTERN_ANALYSIS_DELAY_SECONDS após a primeira
+PATTERN_ANALYSIS_DELAY_SECONDS = 5.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending_analysis: Dict[int, threading.Timer] = {}
+_pending_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Cria o executor sob demanda (e de novo após um shutdown)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PIPELINE_WORKERS,
+            thread_name_prefix="singular-worker",
+        )
+    return _executor
+
+
+def submit_pipeline(lesson_id: int, user_id: int, use_mock: bool) -> Future:
+    """Enfileira o pipeline de importação de uma aula."""
+    return _get_executor().submit(_run_pipeline_job, lesson_id, user_id, use_mock)
+
+
+def schedule_pattern_analysis(user_id: int) -> None:
+    """
+    Agenda `analyze_and_update_patterns` para o usuário.
+    Se já há uma análise pendente para ele, a chamada é absorvida por ela.
+    """
+    with _pending_lock:
+        if user_id in _pending_analysis:
+            return
+        timer = threading.Timer(
+            PATTERN_ANALYSIS_DELAY_SECONDS,
+            _submit_pattern_analysis,
+            args=(user_id,),
+        )
+        timer.daemon = True
+        _pending_analysis[user_id] = timer
+    timer.start()
+
+
+def shutdown(wait: bool = True) -> None:
+    """Encerra o executor, aguardando os jobs em andamento. Chamado no shutdown da app."""
+    global _executor
+    # Análises ainda não disparadas são descartadas: a próxima resposta
+    # errada reanalisa a janela inteira de histórico
+    with _pending_lock:
+        for timer in _pending_analysis.values():
+            timer.cancel()
+        _pending_analysis.clear()
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+
+# ─── Jobs ─────────────────────────────────────────────────────────────────────
+
+def _run_pipeline_job(lesson_id: int, user_id: int, use_mock: bool):
+    """Executa o pipeline com nova sessão do banco."""
+    with SessionLocal() as db:
+        run_import_pipeline(
+            lesson_id=lesson_id,
+            user_id=user_id,
+            db=db,
+            use_mock=use_mock,
+        )
+
+
+def _submit_pattern_analysis(user_id: int):
+    # Libera o slot antes de rodar: respostas que chegarem durante a análise
+    # agendam uma nova rodada em vez de se perderem
+    with _pending_lock:
+        _pending_analysis.pop(user_id, None)
+    _get_executor().submit(_run_pattern_analysis_job, user_id)
+
+
+def _run_pattern_analysis_job(user_id: int):
+    """Executa a análise de padrões com nova sessão do banco."""
+    with SessionLocal() as db:
+        try:
+            analyze_and_update_patterns(user_id, db)
+        except Exception:
+            # Análise é best-effort: a próxima rodada refaz a janela
+            logger.exception("Falha na análise de padrões do usuário %s", user_id)
+            db.rollback()
@@ -29,7 +29,9 @@ try:
 except ImportError:
     pass
 
-from app.database import SessionLocal, create_tables
+from sqlalchemy import insert, text
+
+from app.database import Base, SessionLocal, create_tables
 from app.domain.models import (
     Card,
     CardType,
@@ -45,6 +47,7 @@ from app.domain.models import (
     SRSState,
     Transcript,
     User,
+    utc_now,
 )
 from app.services.extraction import get_mock_extraction
 from app.services.pipeline import run_import_pipeline
@@ -104,18 +107,18 @@ def seed():
 
 
 def _clean_db(db):
-    """Remove todos os dados existentes para seed limpo."""
-    from sqlalchemy import text
-    tables = [
-        "exercise_submissions", "review_logs", "srs_states",
-        "exercises", "cards", "extracted_items", "transcripts",
-        "error_patterns", "lessons", "users"
-    ]
-    for table in tables:
-        try:
+    """
+    Remove todos os dados existentes para seed limpo, numa única transação.
+    Os ids recomeçam em 1 (o seed assume a aula id=1).
+    """
+    # Filhas antes das pais: a ordem inversa de dependência das FKs
+    tables = [table.name for table in reversed(Base.metadata.sorted_tables)]
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+    else:
+        # SQLite sem AUTOINCREMENT: com a tabela vazia, o rowid volta a 1
+        for table in tables:
             db.execute(text(f"DELETE FROM {table}"))
-        except Exception:
-            pass
     db.commit()
 
 
@@ -166,7 +169,16 @@ def _simulate_review_history(db, user_id: int):
     if not cards:
         return
 
-    now = datetime.utcnow()
+    now = utc_now()
+
+    # Estados SRS do usuário carregados uma vez (em vez de uma query por revisão)
+    srs_by_card = {
+        srs.card_id: srs
+        for srs in db.query(SRSState).filter(SRSState.user_id == user_id)
+    }
+
+    # ReviewLogs acumulados e gravados num único INSERT em lote no fim
+    log_rows = []
 
     # Simula revisões nos últimos 7 dias
     for day_offset in range(7, 0, -1):
@@ -193,11 +205,7 @@ def _simulate_review_history(db, user_id: int):
 
             quality = random.choice([4, 5]) if is_correct else random.choice([1, 2])
 
-            srs = db.query(SRSState).filter(
-                SRSState.card_id == card.id,
-                SRSState.user_id == user_id,
-            ).first()
-
+            srs = srs_by_card.get(card.id)
             if not srs:
                 continue
 
@@ -208,17 +216,16 @@ def _simulate_review_history(db, user_id: int):
             }
 
             # Cria ReviewLog
-            log = ReviewLog(
-                card_id=card.id,
-                user_id=user_id,
-                quality=quality,
-                response_time_ms=random.randint(800, 4000),
-                was_correct=is_correct,
-                srs_state_before=state_before,
-                srs_state_after=state_before,  # simplificado para o seed
-                reviewed_at=review_date,
-            )
-            db.add(log)
+            log_rows.append({
+                "card_id": card.id,
+                "user_id": user_id,
+                "quality": quality,
+                "response_time_ms": random.randint(800, 4000),
+                "was_correct": is_correct,
+                "srs_state_before": state_before,
+                "srs_state_after": state_before,  # simplificado para o seed
+                "reviewed_at": review_date,
+            })
 
             # Atualiza SRS de forma simplificada
             if is_correct:
@@ -238,13 +245,12 @@ def _simulate_review_history(db, user_id: int):
     # Ajusta alguns cards para estarem devidos agora (para UI ter algo para revisar)
     due_cards = random.sample(cards, min(5, len(cards)))
     for card in due_cards:
-        srs = db.query(SRSState).filter(
-            SRSState.card_id == card.id,
-            SRSState.user_id == user_id,
-        ).first()
+        srs = srs_by_card.get(card.id)
         if srs:
             srs.due_date = now - timedelta(hours=1)  # vencido há 1h
 
+    if log_rows:
+        db.execute(insert(ReviewLog), log_rows)  # executemany
     db.commit()
 
     # Simula também submissões de exercícios
@@ -260,6 +266,7 @@ def _simulate_exercise_submissions(db, user_id: int, now: datetime):
     if not exercises:
         return
 
+    submission_rows = []
     for i, exercise in enumerate(exercises):
         days_ago = random.randint(1, 7)
         is_correct = random.random() > 0.45  # ~55% de acerto
@@ -268,18 +275,18 @@ def _simulate_exercise_submissions(db, user_id: int, now: datetime):
         if exercise.exercise_type == ExerciseType.BUILD_SENTENCE:
             is_correct = random.random() > 0.55  # ~45% de acerto
 
-        submission = ExerciseSubmission(
-            exercise_id=exercise.id,
-            user_id=user_id,
-            user_answer="resposta_simulada" if not is_correct else exercise.expected_answer,
-            is_correct=is_correct,
-            score=1.0 if is_correct else random.uniform(0.1, 0.5),
-            response_time_ms=random.randint(1000, 6000),
-            error_category=None if is_correct else "vocabulary",
-            submitted_at=now - timedelta(days=days_ago),
-        )
-        db.add(submission)
-
+        submission_rows.append({
+            "exercise_id": exercise.id,
+            "user_id": user_id,
+            "user_answer": "resposta_simulada" if not is_correct else exercise.expected_answer,
+            "is_correct": is_correct,
+            "score": 1.0 if is_correct else random.uniform(0.1, 0.5),
+            "response_time_ms": random.randint(1000, 6000),
+            "error_category": None if is_correct else "vocabulary",
+            "submitted_at": now - timedelta(days=days_ago),
+        })
+
+    db.execute(insert(ExerciseSubmission), submission_rows)  # executemany
     db.commit()
 
 
@@ -303,7 +310,7 @@ def _print_summary(db, user_id: int):
     # Cards devidos agora
     due_now = db.query(SRSState).filter(
         SRSState.user_id == user_id,
-        SRSState.due_date <= datetime.utcnow(),
+        SRSState.due_date <= utc_now(),
     ).count()
 
     print("\n📊 Resumo do seed:")